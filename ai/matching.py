@@ -0,0 +1,117 @@
+# ai/matching.py
+#
+# Moslashtirish kaskadi (CustomChatBot.match):
+#   1. exact   - normallashtirilgan savol bo'yicha hash qidiruv
+#   2. ratio   - fuzz.ratio, score_cutoff bilan (nomzodlar soni cheklangan); threshold dan
+#                yuqori bo'lsa shu yerda to'xtaydi (avvalgi xatti-harakat bilan bir xil)
+#   3. qimmatroq scorerlar (token_set_ratio, WRatio ...) faqat 2-bosqichdan o'tgan nomzodlarda
+
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass, field, asdict, fields
+from rapidfuzz import fuzz
+
+SCORERS = {
+    "ratio": fuzz.ratio,
+    "partial_ratio": fuzz.partial_ratio,
+    "token_sort_ratio": fuzz.token_sort_ratio,
+    "token_set_ratio": fuzz.token_set_ratio,
+    "WRatio": fuzz.WRatio,
+    "QRatio": fuzz.QRatio,
+}
+
+_APOSTROPHES = str.maketrans({"‘": "'", "’": "'", "ʻ": "'", "ʼ": "'", "`": "'"})
+_PUNCTUATION = re.compile(r"[^\w' ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Kichik harf, tutuq belgilari bir xil, tinish belgilarisiz, bitta bo'shliq."""
+    text = _PUNCTUATION.sub(" ", text.lower().translate(_APOSTROPHES))
+    return _SPACES.sub(" ", text).strip()
+
+
+@dataclass
+class MatchConfig:
+    """Sessiya bo'yicha moslashtirish sozlamalari (sessiya faylida "matching" kaliti)."""
+
+    threshold: float = 70
+    prefilter_cutoff: float = 50
+    max_candidates: int = 10
+    rescorers: list = field(default_factory=lambda: ["token_set_ratio"])
+    rescore_threshold: float = 90
+
+    @classmethod
+    def from_dict(cls, data: dict = None) -> "MatchConfig":
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in (data or {}).items() if key in known})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def validate(self):
+        for name in ("threshold", "prefilter_cutoff", "rescore_threshold"):
+            if not 0 <= getattr(self, name) <= 100:
+                raise ValueError(f"{name} must be between 0 and 100")
+        if self.max_candidates < 1:
+            raise ValueError("max_candidates must be at least 1")
+        unknown = [name for name in self.rescorers if name not in SCORERS]
+        if unknown:
+            raise ValueError(f"Unknown scorers: {', '.join(unknown)} (available: {', '.join(SCORERS)})")
+
+
+DEFAULT_CONFIG = MatchConfig()
+
+
+@dataclass
+class MatchResult:
+    question: str = None
+    confidence: float = 0.0
+    stage: str = "miss"
+    responses: list = None
+    # "own" - sessiyaning o'z juftligi, "base" - umumiy korpusdan
+    source: str = None
+
+    @property
+    def matched(self) -> bool:
+        return self.question is not None
+
+    def response(self) -> str:
+        return random.choice(self.responses) if self.matched and self.responses else ""
+
+    def to_dict(self) -> dict:
+        return {"question": self.question, "confidence": round(self.confidence, 2), "stage": self.stage,
+                "source": self.source, "matched": self.matched}
+
+
+class MatchStats:
+    """Har bir sessiya uchun bosqichlar bo'yicha urinishlar soni (qaysi bosqichda chiqildi)."""
+
+    def __init__(self):
+        self._sessions: dict = {}
+
+    def record(self, session_name: str, result: MatchResult):
+        counter = self._sessions.get(session_name)
+        if counter is None:
+            counter = self._sessions[session_name] = Counter()
+        counter[result.stage] += 1
+
+    def forget(self, session_name: str):
+        self._sessions.pop(session_name, None)
+
+    @staticmethod
+    def _summary(counter: Counter) -> dict:
+        total = sum(counter.values())
+        return {"total": total, "stages": dict(counter),
+                "rates": {stage: round(count / total, 4) for stage, count in counter.items()} if total else {}}
+
+    def snapshot(self, session_name: str = None) -> dict:
+        if session_name is not None:
+            return self._summary(self._sessions.get(session_name, Counter()))
+        overall = sum(self._sessions.values(), Counter())
+        return {**self._summary(overall),
+                "sessions": {name: self._summary(counter) for name, counter in self._sessions.items()}}
+
+
+match_stats = MatchStats()
@@ -1,42 +1,135 @@
 import json
 import random
 from rapidfuzz import process, fuzz
+from ai.matching import MatchConfig, MatchResult, DEFAULT_CONFIG, SCORERS, normalize
 
 class CustomChatBot:
-    def __init__(self, data_path):
-        # JSON faylini yuklash
-        with open(data_path, "r", encoding="utf-8") as file:
-            self.data = json.load(file)
+    def __init__(self, data_path=None, data=None, base=None, excluded=(), config: MatchConfig = None):
+        # JSON faylini yuklash (yoki tayyor ma'lumotdan foydalanish)
+        if data is None:
+            with open(data_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        self.data = data
+
+        # Umumiy (base) korpus indeksi: bir marta quriladi va barcha sessiyalar bo'lishadi.
+        # Bu bot faqat sessiyaning o'z juftliklarini indekslaydi, `excluded` savollar bazadan yashiriladi.
+        self.base = base
+        self.excluded = {question.lower() for question in excluded}
+        # Sessiya moslashtirish sozlamalari (ai/matching.py)
+        self.config = config or DEFAULT_CONFIG
         
         # Sukut bo'yicha javoblar
         self.default_responses = [""]
         
-        # Savollar va javoblarni tezkor xotirada saqlash
+        self.reindex(self.data["data"]["pairs"])
+
+    def reindex(self, pairs):
+        # Savollar va javoblarni tezkor xotirada saqlash (joyida - overlay botlar shu obyektga ishora qiladi)
         self.indexed_questions = {
             pair["question"].lower(): pair["responses"]
-            for pair in self.data["data"]["pairs"]
+            for pair in pairs
         }
         
         # Savollar ro'yxatini oldindan tuzish
         self.questions = list(self.indexed_questions.keys())
+        # 1-bosqich: normallashtirilgan savol -> savol. Faqat emoji/tinish belgilaridan iborat
+        # savollarning kaliti bo'sh - ular indekslanmaydi (aks holda "???" ham ularga mos kelardi)
+        self.exact = {}
+        for question in self.questions:
+            key = normalize(question)
+            if key:
+                self.exact.setdefault(key, question)
+        # Bazadan yashiriladigan savollar: o'chirilganlar va sessiya o'zi qayta yozganlari
+        self.hidden = self.excluded | set(self.indexed_questions)
     
+    def apply_diff(self, diff):
+        # Indeksni to'liq qayta qurmasdan faqat o'zgargan savollarni yangilash.
+        # Kichik/katta harf bilan farq qiladigan takror savollar bo'lsa (diff["rebuild"])
+        # chaqiruvchi reindex() qiladi - bu yerda kalitlar to'qnashuvi hisobga olinmaydi.
+        removed = set()
+        for pair in diff["removed"]:
+            removed.add(pair["question"].lower())
+        for pair in diff["added"]:
+            removed.discard(pair["question"].lower())
+        for old_pair, new_pair in diff["changed"]:
+            removed.discard(new_pair["question"].lower())
+
+        for key in removed:
+            self.indexed_questions.pop(key, None)
+            if self.exact.get(normalize(key)) == key:
+                del self.exact[normalize(key)]
+        for pair in diff["added"] + [new_pair for _, new_pair in diff["changed"]]:
+            key = pair["question"].lower()
+            if key not in self.indexed_questions:
+                self.questions.append(key)
+            self.indexed_questions[key] = pair["responses"]
+            if normalize(key):
+                self.exact.setdefault(normalize(key), key)
+
+        if removed:
+            self.questions = [q for q in self.questions if q not in removed]
+        if self.base is not None:
+            self.hidden = self.excluded | set(self.indexed_questions)
+
+    def _exact(self, normalized, excluded=()):
+        if not normalized:
+            return None
+        question = self.exact.get(normalized)
+        if question is None or question in excluded:
+            return None
+        return question, self.indexed_questions[question]
+
+    def _candidates(self, query, config, excluded=()):
+        # 2-bosqich: arzon scorer; score_cutoff dan past savollar umuman qaytarilmaydi
+        if not self.questions:
+            return []
+        matches = process.extract(query, self.questions, scorer=fuzz.ratio, score_cutoff=config.prefilter_cutoff,
+                                  limit=config.max_candidates + len(excluded))
+        return [(question, score, self.indexed_questions[question]) for question, score, _ in matches
+                if question not in excluded][:config.max_candidates]
+
+    def match(self, user_input, config: MatchConfig = None) -> MatchResult:
+        """Kaskad bo'yicha eng yaxshi savol; MatchResult.stage qaysi bosqichda topilganini bildiradi."""
+        config = config or self.config
+        query = user_input.lower()
+
+        normalized = normalize(user_input)
+        hit, source = self._exact(normalized), "own"
+        if hit is None and self.base is not None:
+            hit, source = self.base._exact(normalized, self.hidden), "base"
+        if hit is not None:
+            return MatchResult(hit[0], 100.0, "exact", hit[1], source)
+
+        # O'z savollari teng ballda bazadan ustun (sort barqaror)
+        candidates = [(*candidate, "own") for candidate in self._candidates(query, config)]
+        if self.base is not None:
+            candidates += [(*candidate, "base") for candidate in self.base._candidates(query, config, self.hidden)]
+        if not candidates:
+            return MatchResult()
+        candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+        question, score, responses, source = candidates[0]
+        if score > config.threshold:
+            return MatchResult(question, score, "ratio", responses, source)
+
+        # 3-bosqich: qimmat scorerlar faqat qolgan nomzodlarda
+        for name in config.rescorers:
+            scorer = SCORERS[name]
+            best_score, best = max(((scorer(query, candidate[0], score_cutoff=config.rescore_threshold), candidate)
+                                    for candidate in candidates), key=lambda scored: scored[0])
+            if best_score and best_score >= config.rescore_threshold:
+                return MatchResult(best[0], best_score, name, best[2], best[3])
+        return MatchResult(confidence=score)
+
     def train(self):
         # Modelni o'qitish jarayoni
         print("Model o'qitildi! Kiritilgan savollarga asoslangan javoblar tayyor.")
     
     def respond(self, user_input):
-        # Foydalanuvchi kiritgan matnni kichik harfga o'tkazish
-        user_input = user_input.lower()
-        
-        # Eng yaxshi moslikni oldindan tuzilgan savollar ro'yxatidan topish
-        best_match = process.extractOne(user_input, self.questions, scorer=fuzz.ratio)
-        
-        if best_match and best_match[1] > 70:  # Agar o'xshashlik 70% dan yuqori bo'lsa
-            matched_question = best_match[0]
-            return random.choice(self.indexed_questions[matched_question])  # Tasodifiy javob qaytarish
-        else:
-            # Sukut bo'yicha javob
-            return random.choice(self.default_responses)
+        # Mos savol topilsa - tasodifiy javob, aks holda sukut bo'yicha javob
+        result = self.match(user_input)
+        if result.matched:
+            return result.response()
+        return random.choice(self.default_responses)
     
     def question(self, user_input):
         # Foydalanuvchi kiritgan savolga javob qaytarish
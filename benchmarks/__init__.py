@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+#
+# Matcher va saqlash qatlami uchun benchmarklar.
+# Ishga tushirish:  python -m benchmarks.run --help
@@ -0,0 +1,36 @@
+# benchmarks/bench_matcher.py
+
+import os
+from ai.response import CustomChatBot
+from ai.matching import MatchStats
+from utils import save_json
+from benchmarks.common import metric, measure, latencies, percentile
+from benchmarks.synthetic import make_corpus, make_input_stream
+
+
+def run(sizes: list, queries: int, workdir: str) -> dict:
+    results = {}
+    for size in sizes:
+        corpus = make_corpus(size)
+        data_path = os.path.join(workdir, f"matcher_{size}_data.json")
+        save_json(data_path, corpus)
+
+        bot, build_seconds, build_peak = measure(CustomChatBot, data_path)
+        results[f"matcher.build.n{size}.seconds"] = metric(build_seconds, "s")
+        results[f"matcher.build.n{size}.peak_memory"] = metric(build_peak, "bytes")
+
+        stream = make_input_stream(corpus, queries)
+        samples, total = latencies(bot.respond, stream)
+        results[f"matcher.respond.n{size}.throughput"] = metric(len(stream) / total, "msg/s", "higher")
+        results[f"matcher.respond.n{size}.p50"] = metric(percentile(samples, 50), "s")
+        results[f"matcher.respond.n{size}.p99"] = metric(percentile(samples, 99), "s")
+
+        # Kaskad: xabarlarning qancha qismi arzon bosqichlarda (exact/ratio) tugaydi
+        stats = MatchStats()
+        for text in stream:
+            stats.record("bench", bot.match(text))
+        rates = stats.snapshot("bench")["rates"]
+        results[f"matcher.cascade.n{size}.early_exit_rate"] = metric(rates.get("exact", 0) + rates.get("ratio", 0),
+                                                                     "ratio", "higher")
+        results[f"matcher.cascade.n{size}.miss_rate"] = metric(rates.get("miss", 0), "ratio")
+    return results
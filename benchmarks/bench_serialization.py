@@ -0,0 +1,65 @@
+# benchmarks/bench_serialization.py
+#
+# get_pairs kabi katta javoblar: stdlib json va orjson seriyalash vaqti, hamda gzip/brotli
+# siqish bilan uzatiladigan baytlar va sarflangan CPU.
+
+import gzip
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from benchmarks.common import metric
+from benchmarks.synthetic import make_corpus
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPEAT = 5
+
+
+def _best(fn, repeat: int = REPEAT) -> tuple:
+    """Eng yaxshi natija (soniyalar, CPU soniyalar) va oxirgi qaytgan qiymat."""
+    best_wall = best_cpu = float("inf")
+    result = None
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = fn()
+        best_wall = min(best_wall, time.perf_counter() - wall)
+        best_cpu = min(best_cpu, time.process_time() - cpu)
+    return best_wall, best_cpu, result
+
+
+def run(sizes: list, workdir: str) -> dict:
+    from middleware import COMPRESS_LEVEL
+    results = {}
+    for size in sizes:
+        payload = {"pairs": make_corpus(size)["data"]["pairs"], "stats": {"total_questions": size}}
+        prefix = f"serialization.n{size}"
+
+        # Avvalgi yo'l: FastAPI jsonable_encoder + stdlib json
+        wall, cpu, body = _best(lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False,
+                                                   separators=(",", ":")).encode("utf-8"))
+        results[f"{prefix}.stdlib_encoder.dumps"] = metric(wall, "s")
+        wall, _, _ = _best(lambda: json.loads(body))
+        results[f"{prefix}.stdlib.loads"] = metric(wall, "s")
+        if orjson is not None:
+            wall, _, body = _best(lambda: orjson.dumps(payload))
+            results[f"{prefix}.orjson.dumps"] = metric(wall, "s")
+            wall, _, _ = _best(lambda: orjson.loads(body))
+            results[f"{prefix}.orjson.loads"] = metric(wall, "s")
+
+        results[f"{prefix}.identity.bytes"] = metric(len(body), "bytes")
+        wall, cpu, compressed = _best(lambda: gzip.compress(body, compresslevel=COMPRESS_LEVEL))
+        results[f"{prefix}.gzip.bytes"] = metric(len(compressed), "bytes")
+        results[f"{prefix}.gzip.cpu"] = metric(cpu, "s")
+        if brotli is not None:
+            wall, cpu, compressed = _best(lambda: brotli.compress(body, quality=COMPRESS_LEVEL))
+            results[f"{prefix}.brotli.bytes"] = metric(len(compressed), "bytes")
+            results[f"{prefix}.brotli.cpu"] = metric(cpu, "s")
+    return results
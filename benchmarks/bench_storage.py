@@ -0,0 +1,67 @@
+# benchmarks/bench_storage.py
+
+import copy
+import json
+import os
+import random
+import time
+from fastapi.encoders import jsonable_encoder
+from utils import modify_data, save_json, load_json
+from benchmarks.common import metric, latencies, percentile
+from benchmarks.synthetic import make_corpus, make_sentence
+
+OPERATIONS = ["add_question", "add_response", "edit_question", "edit_response", "delete_response"]
+
+
+def _random_op(rng: random.Random, data: dict) -> tuple:
+    pairs = data["data"]["pairs"]
+    operation = rng.choice(OPERATIONS)
+    pair = rng.choice(pairs)
+    if operation == "add_question":
+        return operation, {"question": make_sentence(rng), "responses": [make_sentence(rng)]}
+    if operation == "add_response":
+        return operation, {"question": pair["question"], "response": make_sentence(rng)}
+    if operation == "edit_question":
+        return operation, {"question": pair["question"], "new_question": pair["question"],
+                           "responses": pair["responses"]}
+    if operation == "edit_response":
+        return operation, {"question": pair["question"], "response_index": 0, "response": make_sentence(rng)}
+    if len(pair["responses"]) < 2:
+        return "add_response", {"question": pair["question"], "response": make_sentence(rng)}
+    return operation, {"question": pair["question"], "response_index": len(pair["responses"]) - 1}
+
+
+def run(sizes: list, ops: int, workdir: str) -> dict:
+    results = {}
+    rng = random.Random(2)
+    for size in sizes:
+        data = make_corpus(size)
+        data_path = os.path.join(workdir, f"storage_{size}_data.json")
+
+        # modify_data: faqat xotiradagi o'zgartirish
+        work = copy.deepcopy(data)
+        samples = []
+        for _ in range(ops):
+            operation, kwargs = _random_op(rng, work)
+            started = time.perf_counter()
+            modify_data(work, operation, **kwargs)
+            samples.append(time.perf_counter() - started)
+        results[f"storage.modify_data.n{size}.mean"] = metric(sum(samples) / len(samples), "s")
+        results[f"storage.modify_data.n{size}.p99"] = metric(percentile(samples, 99), "s")
+
+        # save_json: har bir tahrirdan keyingi to'liq qayta yozish
+        writes = max(1, min(ops, 2000000 // max(size, 1)))
+        samples, _ = latencies(lambda _: save_json(data_path, data), range(writes))
+        results[f"storage.save_json.n{size}.mean"] = metric(sum(samples) / len(samples), "s")
+        results[f"storage.file.n{size}.bytes"] = metric(os.path.getsize(data_path), "bytes")
+
+        samples, _ = latencies(lambda _: load_json(data_path), range(writes))
+        results[f"storage.load_json.n{size}.mean"] = metric(sum(samples) / len(samples), "s")
+
+        # get_pairs javobini FastAPI kabi seriyalash
+        payload = {"pairs": data["data"]["pairs"], "stats": {"total_questions": size}}
+        started = time.perf_counter()
+        body = json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode("utf-8")
+        results[f"storage.get_pairs.n{size}.serialize"] = metric(time.perf_counter() - started, "s")
+        results[f"storage.get_pairs.n{size}.bytes"] = metric(len(body), "bytes")
+    return results
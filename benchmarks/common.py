@@ -0,0 +1,43 @@
+# benchmarks/common.py
+
+import gc
+import time
+import tracemalloc
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    """Natija yozuvi; `better` solishtirish yo'nalishini bildiradi ("lower" yoki "higher")."""
+    return {"value": value, "unit": unit, "better": better}
+
+
+def measure(fn, *args, **kwargs):
+    """Funksiyani bir marta bajaradi: (natija, soniyalar, eng yuqori xotira baytlarda)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def latencies(fn, inputs: list) -> tuple:
+    """Har bir kirish uchun kechikish va umumiy vaqt."""
+    samples = []
+    started = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - started
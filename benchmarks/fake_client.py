@@ -0,0 +1,123 @@
+# benchmarks/fake_client.py
+#
+# Pyrogram `Client` o'rnini bosuvchi mahalliy soxta mijoz: client_manager.start_client
+# va /get_sessions ishlatadigan metodlarni Telegramga ulanmasdan taqlid qiladi.
+
+import asyncio
+import itertools
+import os
+import zlib
+from dataclasses import dataclass, field
+from pyrogram import enums
+
+_message_ids = itertools.count(1)
+
+
+@dataclass
+class FakeUser:
+    id: int
+    first_name: str = "Load"
+    last_name: str = ""
+    username: str = ""
+    is_bot: bool = False
+
+
+@dataclass
+class FakeChat:
+    id: int
+    type: enums.ChatType = enums.ChatType.PRIVATE
+
+
+@dataclass
+class FakeMessage:
+    from_user: FakeUser
+    chat: FakeChat
+    text: str = None
+    voice: object = None
+    caption: str = None
+    id: int = field(default_factory=lambda: next(_message_ids))
+
+
+@dataclass
+class FakePhoto:
+    file_id: str
+
+
+@dataclass
+class SentMessage:
+    chat_id: int
+    text: str
+    reply_to_message_id: int = None
+
+
+class FakeClient:
+    """`pyrogram.Client` bilan bir xil konstruktor imzosi; API chaqiruvlari `api_latency` soniya davom etadi."""
+
+    api_latency: float = 0.0
+
+    def __init__(self, name: str, api_id=None, api_hash=None, workdir: str = None, **kwargs):
+        self.name = name
+        self.workdir = workdir
+        self.handlers = []
+        self.sent = []
+        self.is_connected = False
+        self.me = FakeUser(id=zlib.crc32(name.encode()), first_name=name, username=name)
+
+    async def _api_call(self):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    def on_message(self, filters=None):
+        def decorator(func):
+            self.handlers.append((filters, func))
+            return func
+        return decorator
+
+    async def start(self):
+        await self._api_call()
+        self.is_connected = True
+        return self
+
+    async def stop(self):
+        self.is_connected = False
+        return self
+
+    async def get_me(self):
+        await self._api_call()
+        return self.me
+
+    async def send_message(self, chat_id, text, reply_to_message_id=None, **kwargs):
+        await self._api_call()
+        sent = SentMessage(chat_id, text, reply_to_message_id)
+        self.sent.append(sent)
+        return sent
+
+    async def get_chat_photos(self, chat_id, limit: int = 0):
+        await self._api_call()
+        yield FakePhoto(file_id=f"{self.name}_photo")
+
+    async def download_media(self, file_id, file_name: str = None, **kwargs):
+        await self._api_call()
+        os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+        with open(file_name, "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0" + file_id.encode() + b"\xff\xd9")
+        return file_name
+
+    async def deliver(self, message: FakeMessage) -> bool:
+        """Xabarni ro'yxatdan o'tgan handlerlarga Pyrogram dispetcheri kabi uzatadi.
+
+        auto_reply xabarni scheduler navbatiga qo'yib, uning futureini qaytaradi - javob
+        o'lchovlari uchun moslashtirish va yuborish (yoki tashlanish) ham kutiladi.
+        """
+        if not self.is_connected:
+            return False
+        handled = False
+        for filters, func in self.handlers:
+            if filters is None or await filters(self, message):
+                result = await func(self, message)
+                # Moslashtirish ishi yuborish ishining futureini qaytaradi
+                while isinstance(result, asyncio.Future):
+                    await asyncio.wait([result])
+                    result = None if result.cancelled() else result.result()
+                handled = True
+        return handled
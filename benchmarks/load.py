@@ -0,0 +1,226 @@
+# benchmarks/load.py
+#
+# Soxta Pyrogram mijozlari bilan end-to-end yuklama testi:
+#   python -m benchmarks.load --sessions 20 --users 50 --rate 0.2 --duration 30
+#
+# N sessiya x M foydalanuvchi x K xabar/soniya (har bir foydalanuvchi uchun) haqiqiy
+# auto_reply mantiqi orqali o'tadi, parallel ravishda FastAPI marshrutlari chaqiriladi.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def _prepare_env(workdir: str, args):
+    # config.py import qilinishidan oldin chaqirilishi kerak
+    os.environ.update({
+        "SESSIONS_DIR": os.path.join(workdir, "sessions"),
+        "DATA_DIR": os.path.join(workdir, "session_data"),
+        "PHOTOS_DIR": os.path.join(workdir, "profile_photos"),
+        "REPLY_DELAY_MIN": str(args.reply_delay_min),
+        "REPLY_DELAY_MAX": str(args.reply_delay_max),
+        "TRACE_FILE": os.path.join(workdir, "traces.jsonl"),
+    })
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _summary(samples: list) -> dict:
+    from benchmarks.common import percentile
+    return {"count": len(samples), "p50": percentile(samples, 50), "p90": percentile(samples, 90),
+            "p99": percentile(samples, 99), "max": max(samples) if samples else 0.0}
+
+
+class LoadStats:
+    def __init__(self):
+        self.sent = 0
+        self.dropped = 0
+        self.replied = 0
+        self.reply_latency = []
+        self.loop_lag = []
+        self.route_latency = {}
+        self.memory = []
+
+
+async def _monitor_loop_lag(stats: LoadStats, stop: asyncio.Event, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, loop.time() - started - interval))
+
+
+async def _monitor_memory(stats: LoadStats, stop: asyncio.Event, started: float, use_tracemalloc: bool):
+    while not stop.is_set():
+        sample = {"t": round(time.perf_counter() - started, 2), "rss": _rss_bytes()}
+        if use_tracemalloc:
+            sample["traced"] = tracemalloc.get_traced_memory()[0]
+        stats.memory.append(sample)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _deliver(session_name: str, message, stats: LoadStats):
+    from client_manager import active_clients
+    client = active_clients.get(session_name)
+    if client is None:
+        # Sessiya to'xtatilgan, boshqa jarayonga topshirilgan yoki o'chirilgan
+        stats.dropped += 1
+        return
+    sent_before = len(client.sent)
+    started = time.perf_counter()
+    await client.deliver(message)
+    if len(client.sent) > sent_before:
+        stats.replied += 1
+        stats.reply_latency.append(time.perf_counter() - started)
+
+
+async def _user(session_name: str, user_id: int, questions: list, rate: float, stats: LoadStats,
+                stop: asyncio.Event, tasks: set, rng: random.Random):
+    from benchmarks.fake_client import FakeMessage, FakeUser, FakeChat
+    user = FakeUser(id=user_id)
+    chat = FakeChat(id=user_id)
+    await asyncio.sleep(rng.random() / rate)
+    while not stop.is_set():
+        text = rng.choice(questions) if rng.random() < 0.8 else f"noma'lum xabar {rng.randint(0, 10 ** 6)}"
+        task = asyncio.create_task(_deliver(session_name, FakeMessage(user, chat, text=text), stats))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        stats.sent += 1
+        await asyncio.sleep(rng.expovariate(rate))
+
+
+async def _route_driver(http, session_names: list, rate: float, stats: LoadStats, stop: asyncio.Event,
+                        rng: random.Random):
+    calls = [
+        ("GET /get_sessions", lambda s: http.get("/get_sessions")),
+        ("GET /get_pairs", lambda s: http.get(f"/get_pairs/{s}")),
+        ("GET /check_session", lambda s: http.get(f"/check_session/{s}")),
+        ("POST /add_response", lambda s: http.post(f"/add_response/{s}", params={"question": "salom"},
+                                                   json={"response": f"Salom {rng.randint(0, 999)}"})),
+    ]
+    weights = [3, 5, 5, 1]
+    while not stop.is_set():
+        name, call = rng.choices(calls, weights=weights)[0]
+        started = time.perf_counter()
+        response = await call(rng.choice(session_names))
+        elapsed = time.perf_counter() - started
+        stats.route_latency.setdefault(name, []).append(elapsed)
+        if response.status_code >= 400:
+            stats.route_latency.setdefault(f"{name} errors", []).append(elapsed)
+        await asyncio.sleep(rng.expovariate(rate))
+
+
+async def run_load(args) -> dict:
+    import httpx
+    import client_manager
+    import main
+    from benchmarks.fake_client import FakeClient
+    from config import DIRS, DEFAULT_DATA_PATH
+    from utils import load_json
+
+    FakeClient.api_latency = args.api_latency_ms / 1000
+    client_manager.Client = FakeClient
+
+    session_names = [f"load_{i}" for i in range(args.sessions)]
+    for name in session_names:
+        open(os.path.join(DIRS["sessions"], f"{name}.session"), "wb").close()
+    questions = [pair["question"] for pair in load_json(DEFAULT_DATA_PATH)["data"]["pairs"]] or ["salom"]
+
+    stats = LoadStats()
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+    tasks = set()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as http:
+            started = time.perf_counter()
+            monitors = [asyncio.create_task(_monitor_loop_lag(stats, stop)),
+                        asyncio.create_task(_monitor_memory(stats, stop, started, args.tracemalloc))]
+            producers = [asyncio.create_task(_user(name, 10_000 * i + u, questions, args.rate, stats, stop, tasks,
+                                                   random.Random(rng.random())))
+                         for i, name in enumerate(session_names) for u in range(args.users)]
+            if args.route_rate > 0:
+                producers.append(asyncio.create_task(_route_driver(http, session_names, args.route_rate,
+                                                                   stats, stop, random.Random(rng.random()))))
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(*producers, *monitors, return_exceptions=True)
+            # Boshlangan javoblar tugashini kutamiz
+            if tasks:
+                await asyncio.wait(list(tasks), timeout=args.reply_delay_max + 30)
+            elapsed = time.perf_counter() - started
+    if args.tracemalloc:
+        tracemalloc.stop()
+
+    memory_start = stats.memory[0]["rss"] if stats.memory else 0
+    memory_end = stats.memory[-1]["rss"] if stats.memory else 0
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "elapsed": elapsed,
+        "messages": {"sent": stats.sent, "replied": stats.replied, "dropped": stats.dropped,
+                     "throughput": stats.sent / elapsed, "reply_throughput": stats.replied / elapsed},
+        "reply_latency": _summary(stats.reply_latency),
+        "loop_lag": _summary(stats.loop_lag),
+        "routes": {name: _summary(samples) for name, samples in stats.route_latency.items()},
+        "memory": {"rss_start": memory_start, "rss_end": memory_end, "rss_growth": memory_end - memory_start,
+                   "samples": stats.memory},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load")
+    parser.add_argument("--sessions", "-n", type=int, default=10)
+    parser.add_argument("--users", "-m", type=int, default=20, help="har bir sessiyadagi foydalanuvchilar")
+    parser.add_argument("--rate", "-k", type=float, default=0.5, help="har bir foydalanuvchi uchun xabar/soniya")
+    parser.add_argument("--duration", type=float, default=20.0, help="soniya")
+    parser.add_argument("--route-rate", type=float, default=20.0, help="FastAPI so'rovlari/soniya (0 = o'chiq)")
+    parser.add_argument("--api-latency-ms", type=float, default=5.0, help="soxta Telegram API kechikishi")
+    parser.add_argument("--reply-delay-min", type=float, default=0.0)
+    parser.add_argument("--reply-delay-max", type=float, default=0.0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Python allokatsiyalarini ham kuzatish")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="hisobotni JSON faylga yozish (aks holda stdout)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="torex_load_")
+    try:
+        _prepare_env(workdir, args)
+        import logging
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("torex").setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        report = asyncio.run(run_load(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(result)
+    else:
+        print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
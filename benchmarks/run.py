@@ -0,0 +1,97 @@
+# benchmarks/run.py
+#
+#   python -m benchmarks.run run --sizes 100,1000,10000 --output bench.json
+#   python -m benchmarks.run compare baseline.json bench.json --threshold 0.15
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from benchmarks import bench_matcher, bench_storage, bench_serialization
+
+SUITES = {
+    "matcher": lambda args, workdir: bench_matcher.run(args.sizes, args.queries, workdir),
+    "storage": lambda args, workdir: bench_storage.run(args.sizes, args.ops, workdir),
+    "serialization": lambda args, workdir: bench_serialization.run(args.sizes, workdir),
+}
+
+
+def run_suites(args) -> dict:
+    # Benchmark paytida INFO loglari o'lchovni buzmasligi uchun
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("torex").setLevel(logging.WARNING)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.suites:
+            print(f"[{name}] sizes={args.sizes}", file=sys.stderr)
+            metrics.update(SUITES[name](args, workdir))
+    return {
+        "meta": {"created": time.time(), "python": platform.python_version(), "platform": platform.platform(),
+                 "sizes": args.sizes, "queries": args.queries, "ops": args.ops},
+        "metrics": metrics,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, thresholds: dict = None) -> list:
+    """Chegaradan ortiq yomonlashgan metrikalar ro'yxati."""
+    regressions = []
+    for key, base in baseline["metrics"].items():
+        cur = current["metrics"].get(key)
+        if cur is None or not base["value"]:
+            continue
+        limit = (thresholds or {}).get(key, threshold)
+        change = (cur["value"] - base["value"]) / base["value"]
+        if base.get("better", "lower") == "higher":
+            change = -change
+        if change > limit:
+            regressions.append({"metric": key, "baseline": base["value"], "current": cur["value"],
+                                "change": round(change, 4), "threshold": limit, "unit": base["unit"]})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="benchmarklarni ishga tushirish")
+    run_p.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[100, 1000, 10000])
+    run_p.add_argument("--queries", type=int, default=2000, help="respond() chaqiruvlari soni")
+    run_p.add_argument("--ops", type=int, default=500, help="modify_data operatsiyalari soni")
+    run_p.add_argument("--suites", type=lambda v: v.split(","), default=list(SUITES))
+    run_p.add_argument("--output", "-o", help="natijani JSON faylga yozish (aks holda stdout)")
+
+    cmp_p = sub.add_parser("compare", help="ikki natijani solishtirish")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.15, help="ruxsat etilgan yomonlashish (0.15 = 15%%)")
+    cmp_p.add_argument("--metric-threshold", action="append", default=[], metavar="KEY=VALUE",
+                       help="alohida metrika uchun chegara")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        unknown = set(args.suites) - set(SUITES)
+        if unknown:
+            parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+        result = json.dumps(run_suites(args), indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(result)
+        else:
+            print(result)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    thresholds = {k: float(v) for k, v in (item.split("=", 1) for item in args.metric_threshold)}
+    regressions = compare(baseline, current, args.threshold, thresholds)
+    print(json.dumps({"regressions": regressions, "ok": not regressions}, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/synthetic.py
+
+import itertools
+import random
+
+# O'zbekcha so'zlarga o'xshash bo'g'inlar
+SYLLABLES = ["sa", "lom", "qa", "lay", "yax", "shi", "mi", "siz", "ra", "xmat", "bor", "yo'q", "ni", "ma",
+             "gap", "kel", "di", "ing", "ish", "lar", "qan", "day", "o'z", "bek", "ton", "cha", "ga", "dan",
+             "ol", "ber", "ka", "ta", "ku", "chuk", "jon", "do'st", "uy", "bu", "gun", "er", "ta", "o'q"]
+EMOJIS = ["😊", "🤞", "👍", "😂", "🙂", ""]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+
+
+def make_sentence(rng: random.Random, min_words: int = 1, max_words: int = 5) -> str:
+    return " ".join(make_word(rng) for _ in range(rng.randint(min_words, max_words)))
+
+
+def make_corpus(size: int, seed: int = 0) -> dict:
+    """`size` ta savol-javob juftligidan iborat sessiya ma'lumotini yaratadi."""
+    rng = random.Random(seed)
+    pairs, seen = [], set()
+    while len(pairs) < size:
+        question = make_sentence(rng, 1, 4)
+        if question in seen:
+            continue
+        seen.add(question)
+        responses = [(make_sentence(rng, 1, 6) + " " + rng.choice(EMOJIS)).strip()
+                     for _ in range(rng.randint(1, 4))]
+        pairs.append({"question": question, "responses": responses})
+    return {"data": {"pairs": pairs}}
+
+
+def _typo(rng: random.Random, text: str) -> str:
+    if len(text) < 3:
+        return text
+    i = rng.randrange(len(text) - 1)
+    kind = rng.random()
+    if kind < 0.4:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if kind < 0.7:
+        return text[:i] + text[i + 1:]
+    return text[:i] + rng.choice("aeiouqxshy") + text[i:]
+
+
+def make_input_stream(corpus: dict, count: int, seed: int = 1, zipf_s: float = 1.1,
+                      hit_ratio: float = 0.7, typo_ratio: float = 0.3) -> list:
+    """Real trafikka o'xshash kiruvchi xabarlar oqimi.
+
+    Savollar Zipf taqsimoti bo'yicha takrorlanadi (bir nechta savol juda ko'p keladi),
+    bir qismi imlo xatolari bilan, qolgani korpusda yo'q tasodifiy matnlar.
+    """
+    rng = random.Random(seed)
+    questions = [pair["question"] for pair in corpus["data"]["pairs"]]
+    cum_weights = list(itertools.accumulate(1.0 / (rank ** zipf_s) for rank in range(1, len(questions) + 1)))
+    stream = []
+    for _ in range(count):
+        if questions and rng.random() < hit_ratio:
+            text = rng.choices(questions, cum_weights=cum_weights)[0]
+            if rng.random() < typo_ratio:
+                text = _typo(rng, text)
+            if rng.random() < 0.2:
+                text = text.capitalize()
+        else:
+            text = make_sentence(rng, 1, 8)
+        stream.append(text)
+    return stream
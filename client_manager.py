@@ -2,18 +2,29 @@
 
 import os
 from pyrogram import Client, filters
-from config import API_ID, API_HASH, DIRS, REPLY_INTERVAL, REPLY_THRESHOLD, logger, DEFAULT_DATA_PATH
-from utils import load_json, save_json, get_session_data_path, session_data_cache, update_stats_cache
+from config import (API_ID, API_HASH, DIRS, REPLY_INTERVAL, REPLY_THRESHOLD, REPLY_DELAY_MIN, REPLY_DELAY_MAX,
+                    get_logger)
+from utils import get_session_data_path, update_stats_cache
+from corpus import base_corpus
+from persistence import store
+from search import search_index
 from handlers import session_bots
-import asyncio
+from tracing import tracer
+from lifecycle import lifecycle
+from scheduler import scheduler
+from unmatched import unmatched_log
+from events import event_bus
+from ai.matching import match_stats
 import random
 import time
 from fastapi import HTTPException
 
+logger = get_logger("clients")
+# Har bir xabar uchun yoziladigan loglar (LOG_MESSAGE_SAMPLE_RATE bo'yicha namunaga olinadi)
+message_logger = get_logger("messages")
+
 active_clients: dict = {}
-cache_storage: dict = {}
 message_timestamps: dict = {}
-login_states: dict = {}
 
 
 async def start_client(session_name: str):
@@ -29,53 +40,115 @@ async def start_client(session_name: str):
         return {"message": f"{session_name} sessiya fayli topilmadi"}
 
     logger.info(f"{session_name} uchun mijozni boshlaymiz")
+    # Avval topshirilgan (handoff) sessiya qayta ishga tushirilsa, yana javob beradi
+    lifecycle.released.discard(session_name)
     client = Client(session_name, api_id=API_ID, api_hash=API_HASH, workdir=DIRS["sessions"])
 
     # Ma'lumot faylini tayyorlaymiz
     session_data_path = get_session_data_path(session_name)
     if not os.path.exists(session_data_path):
         logger.info(f"{session_name} uchun ma'lumot fayli yo'q, yangi yaratamiz")
-        data = load_json(DEFAULT_DATA_PATH)
-        save_json(session_data_path, data)
-        session_data_cache[session_name] = data
+        data = base_corpus.new_session_data()
+        await store.write(session_name, data)
         update_stats_cache(session_name, data["data"]["pairs"])
+        search_index.index_session(session_name, data["data"]["pairs"])
 
     from handlers import update_session_bot
     logger.info(f"{session_name} uchun botni yangilaymiz")
     await update_session_bot(session_name, session_data_path)
 
-    # Avtomatik javob berish funksiyasi
+    # Avtomatik javob berish funksiyasi. Handler faqat xabarni sessiya navbatiga qo'yadi:
+    # get_me, moslashtirish va yuborish scheduler ishchilarida, sessiya chegaralari bilan bajariladi
     @client.on_message((filters.text | filters.voice) & filters.private)
     async def auto_reply(_, message):
-        now = time.time()
-        user_id = message.from_user.id
-        my_id = (await client.get_me()).id
-        if message.from_user.is_bot or user_id == my_id:
-            return
-        timestamps = message_timestamps.setdefault(user_id, [])
-        timestamps.append(now)
-        timestamps[:] = [ts for ts in timestamps if now - ts <= REPLY_INTERVAL]
-        if len(timestamps) < REPLY_THRESHOLD and (timestamps[-1] - timestamps[0] > REPLY_INTERVAL):
-            return
-        await asyncio.sleep(random.randint(3, 6))
-        text = message.text or "aaauuudddiiiooo"
-        response = session_bots[session_name].question(text)
-        if not response or response in ("None", ""):
+        if not lifecycle.accepts(session_name) or message.from_user.is_bot:
             return
-        await client.send_message(
-            message.chat.id,
-            response,
-            reply_to_message_id=message.id if len(timestamps) >= REPLY_THRESHOLD and random.random() < 0.5 else None
-        )
+        received = time.time()
+
+        def shed(_job):
+            # Sessiya navbati to'lib, eng eski xabar moslashtirilmasdan tashlandi
+            logger.warning("%s: queue full, dropped message from chat %s", session_name, message.chat.id)
+            event_bus.publish("reply.skipped", session_name, chat_id=message.chat.id, reason="shed")
+
+        return scheduler.submit(session_name, lambda: process(message, received), on_shed=shed)
+
+    async def process(message, now: float):
+        """Moslashtirish ishi; javob topilsa yuborish ishining futureini qaytaradi."""
+        with tracer.span("auto_reply", session=session_name):
+            user_id = message.from_user.id
+            with tracer.span("telegram.get_me"):
+                my_id = (await client.get_me()).id
+            if user_id == my_id:
+                return None
+            event_bus.publish("message.received", session_name, chat_id=message.chat.id, user_id=user_id,
+                              text=(message.text or "")[:200], voice=message.text is None)
+            timestamps = message_timestamps.setdefault(user_id, [])
+            timestamps.append(now)
+            timestamps[:] = [ts for ts in timestamps if now - ts <= REPLY_INTERVAL]
+            if len(timestamps) < REPLY_THRESHOLD and (timestamps[-1] - timestamps[0] > REPLY_INTERVAL):
+                return None
+            text = message.text or "aaauuudddiiiooo"
+            with tracer.span("matcher.question"):
+                match = session_bots[session_name].match(text)
+            match_stats.record(session_name, match)
+            response = match.response()
+            if not response or response in ("None", ""):
+                message_logger.info("%s: no match for chat %s (best %.1f)", session_name, message.chat.id,
+                                    match.confidence, extra={"session": session_name, "chat_id": message.chat.id})
+                event_bus.publish("reply.skipped", session_name, chat_id=message.chat.id, reason="no_match",
+                                  confidence=round(match.confidence, 2))
+                if message.text:
+                    unmatched_log.record(session_name, message.text, match.confidence)
+                return None
+            # Javob kechikish davomida reestrda turadi: drain/handoff uni yuboradi yoki saqlaydi
+            reply = lifecycle.track(
+                session_name, message.chat.id, response,
+                reply_to_message_id=message.id if len(timestamps) >= REPLY_THRESHOLD and random.random() < 0.5 else None
+            )
+            if reply is None:
+                # Sessiya navbatda turgan paytda yangi jarayonga topshirildi
+                event_bus.publish("reply.skipped", session_name, chat_id=message.chat.id, reason="handed_off")
+                return None
+
+        async def send():
+            try:
+                if reply.abandoned:
+                    event_bus.publish("reply.skipped", session_name, chat_id=reply.chat_id, reason="handed_off")
+                    return
+                with tracer.span("telegram.send_message", session=session_name):
+                    await client.send_message(reply.chat_id, reply.text,
+                                              reply_to_message_id=reply.reply_to_message_id)
+                message_logger.info("%s: replied to chat %s", session_name, reply.chat_id,
+                                    extra={"session": session_name, "chat_id": reply.chat_id})
+                event_bus.publish("reply.sent", session_name, chat_id=reply.chat_id, text=reply.text[:200],
+                                  latency=round(time.time() - now, 3), match=match.to_dict())
+            finally:
+                lifecycle.done(reply)
+
+        def shed(_job):
+            # Sessiya navbati to'lib, eng eski javob tashlandi
+            if not reply.abandoned:
+                reply.abandoned = True
+                logger.warning("%s: reply queue full, dropped reply to chat %s", session_name, reply.chat_id)
+                event_bus.publish("reply.skipped", session_name, chat_id=reply.chat_id, reason="shed")
+            lifecycle.done(reply)
+
+        # Kechikish navbatda o'tadi: ishchi band bo'lmaydi (drain paytida darhol yuboriladi)
+        delay = 0.0 if lifecycle.draining else random.uniform(REPLY_DELAY_MIN, REPLY_DELAY_MAX)
+        return scheduler.submit(session_name, send, delay=delay, on_shed=shed)
 
     # Mijozni boshlash
     try:
         await client.start()
         active_clients[session_name] = client
+        from profiles import schedule_refresh
+        schedule_refresh(session_name, client)
         logger.info(f"{session_name} muvaffaqiyatli boshlandi. Faol sessiyalar: {list(active_clients.keys())}")
+        event_bus.publish("session.started", session_name, active=len(active_clients))
         return {"message": f"{session_name} muvaffaqiyatli boshlandi"}
     except Exception as e:
         logger.error(f"{session_name} ni boshlashda xato: {str(e)}")
+        event_bus.publish("session.error", session_name, error=str(e))
         return {"message": f"Xato: {str(e)}"}
 
 
@@ -87,5 +160,8 @@ async def stop_client(session_name: str):
     client = active_clients[session_name]
     await client.stop()
     del active_clients[session_name]
+    from profiles import forget_profile
+    forget_profile(session_name)
     logger.info(f"{session_name} to'xtatildi. Faol sessiyalar: {list(active_clients.keys())}")
+    event_bus.publish("session.stopped", session_name, active=len(active_clients))
     return {"message": f"{session_name} to'xtatildi"}
\ No newline at end of file
@@ -5,10 +5,18 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-# Logging setup
-import logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Logging setup: yozish alohida threadda; quyi tizimlar darajasi LOG_LEVELS da ("persistence=WARNING,...")
+from logging_setup import setup_logging, get_logger
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_FILE = os.getenv("LOG_FILE") or None
+# Har bir xabar uchun yoziladigan (auto_reply) loglarning namunaga olinadigan ulushi
+LOG_MESSAGE_SAMPLE_RATE = float(os.getenv("LOG_MESSAGE_SAMPLE_RATE", 0.01))
+# Loglardagi katta obyektlar (sessiya ma'lumotlari) shu uzunlikdan kesiladi
+LOG_PAYLOAD_LIMIT = int(os.getenv("LOG_PAYLOAD_LIMIT", 1000))
+setup_logging(LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_FILE, LOG_MESSAGE_SAMPLE_RATE, LOG_PAYLOAD_LIMIT)
+logger = get_logger()
 
 # Constants from .env
 API_ID = int(os.getenv("API_ID"))
@@ -22,8 +30,71 @@ DIRS = {
 }
 REPLY_INTERVAL = int(os.getenv("REPLY_INTERVAL"))
 REPLY_THRESHOLD = int(os.getenv("REPLY_THRESHOLD"))
+# Javob berishdan oldingi "odamga o'xshash" kechikish (soniya)
+REPLY_DELAY_MIN = float(os.getenv("REPLY_DELAY_MIN", 3))
+REPLY_DELAY_MAX = float(os.getenv("REPLY_DELAY_MAX", 6))
 DEFAULT_DATA_PATH = os.getenv("DEFAULT_DATA_PATH")
 MAX_CACHE_SIZE = int(os.getenv("MAX_CACHE_SIZE"))
+# DATA_DIR kuzatuvchisi: shu vaqt ichidagi hodisalar bitta qayta yuklashga birlashtiriladi (soniya)
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", 0.5))
+# Sessiya fayllarini kechiktirib yozish: sukunatdan keyin / birinchi o'zgarishdan eng ko'pi bilan (soniya),
+# yozish xatosida qayta urinishlar soni
+PERSIST_DELAY = float(os.getenv("PERSIST_DELAY", 1.0))
+PERSIST_MAX_DELAY = float(os.getenv("PERSIST_MAX_DELAY", 5.0))
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", 5))
+
+# Sessiya profillari (get_sessions) uchun fon yangilanishi
+PROFILE_REFRESH_INTERVAL = int(os.getenv("PROFILE_REFRESH_INTERVAL", 300))
+PROFILE_TTL = int(os.getenv("PROFILE_TTL", 900))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 1000))
+PROFILE_REFRESH_CONCURRENCY = int(os.getenv("PROFILE_REFRESH_CONCURRENCY", 4))
+PHOTO_CACHE_SIZE = int(os.getenv("PHOTO_CACHE_SIZE", 256))
+
+# Kutilayotgan loginlar (/start_login -> /verify_code): muddati, soni va tozalash oralig'i
+LOGIN_TTL = int(os.getenv("LOGIN_TTL", 300))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", 50))
+LOGIN_CLEANUP_INTERVAL = int(os.getenv("LOGIN_CLEANUP_INTERVAL", 30))
+
+# Drain / handoff: kutayotgan javoblar uchun vaqt, yuborilmaganlar fayli, eski jarayon manzili
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 10))
+PENDING_REPLIES_FILE = os.getenv("PENDING_REPLIES_FILE", "pending_replies.json")
+PENDING_REPLY_MAX_AGE = int(os.getenv("PENDING_REPLY_MAX_AGE", 600))
+HANDOFF_FROM = os.getenv("HANDOFF_FROM", "")
+HANDOFF_TIMEOUT = float(os.getenv("HANDOFF_TIMEOUT", 30))
+
+# JSON seriyalash ("orjson" mavjud bo'lsa u, "json" - majburan stdlib) va javoblarni siqish
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson")
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+
+# Jonli hodisalar (/events, /ws/events): obunachi navbati, qayta ulanish uchun tarix, heartbeat (soniya)
+EVENTS_BUFFER = int(os.getenv("EVENTS_BUFFER", 256))
+EVENTS_REPLAY = int(os.getenv("EVENTS_REPLAY", 1000))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", 15))
+
+# Javoblarni yuborish rejalashtiruvchisi: umumiy ishchilar, sessiya bo'yicha parallellik va navbat
+# chegarasi (oshsa eng eski javob tashlanadi), og'irliklar ("vip=3,other=1", standart 1)
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", 16))
+SESSION_CONCURRENCY = int(os.getenv("SESSION_CONCURRENCY", 2))
+SESSION_QUEUE_LIMIT = int(os.getenv("SESSION_QUEUE_LIMIT", 100))
+SESSION_WEIGHTS = os.getenv("SESSION_WEIGHTS", "")
+
+# Javob topilmagan xabarlar jurnali: katalog (DATA_DIR dan tashqarida), yozish oralig'i va partiyasi,
+# xotiradagi bufer chegarasi, segment hajmi/soni, xulosadagi iboralar soni va sketch o'lchamlari
+UNMATCHED_DIR = os.getenv("UNMATCHED_DIR", "unmatched")
+UNMATCHED_FLUSH_INTERVAL = float(os.getenv("UNMATCHED_FLUSH_INTERVAL", 2))
+UNMATCHED_BATCH = int(os.getenv("UNMATCHED_BATCH", 500))
+UNMATCHED_BUFFER = int(os.getenv("UNMATCHED_BUFFER", 10000))
+UNMATCHED_SEGMENT_BYTES = int(os.getenv("UNMATCHED_SEGMENT_BYTES", 8 * 1024 * 1024))
+UNMATCHED_SEGMENTS = int(os.getenv("UNMATCHED_SEGMENTS", 8))
+UNMATCHED_TOP_K = int(os.getenv("UNMATCHED_TOP_K", 100))
+UNMATCHED_SKETCH_WIDTH = int(os.getenv("UNMATCHED_SKETCH_WIDTH", 2048))
+UNMATCHED_SKETCH_DEPTH = int(os.getenv("UNMATCHED_SKETCH_DEPTH", 4))
+
+# Tracing / profiling
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
 
 # Create directories
 for dir_path in DIRS.values():
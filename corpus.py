@@ -0,0 +1,235 @@
+# corpus.py
+#
+# Umumiy (base) korpus va sessiya overlaylari.
+#
+# Yangi sessiyalar DEFAULT_DATA_PATH nusxasini olmaydi; ularning fayli faqat farqni saqlaydi:
+#   {"base": "default", "overlay": {"upserts": [juftliklar], "tombstones": [savollar]}}
+# Xotirada (session_data_cache) esa to'liq ko'rinish saqlanadi:
+#   {"base": "default", "data": {"pairs": [...]}}
+# shuning uchun modify_data va boshqa marshrutlar o'zgarishsiz ishlaydi.
+# "base" kaliti bo'lmagan eski fayllar (to'liq nusxalar) avvalgidek ishlaydi.
+
+import asyncio
+from config import DEFAULT_DATA_PATH, get_logger
+from utils import load_json, save_json, modify_data, diff_pairs, duplicates_changed
+from ai.response import CustomChatBot
+from ai.matching import MatchConfig, DEFAULT_CONFIG
+
+logger = get_logger("corpus")
+
+BASE_NAME = "default"
+
+
+class BaseEditError(Exception):
+    """Baza tahriri rad etildi (route uni `status_code` bilan HTTP xatoga aylantiradi)."""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def copy_pair(pair: dict) -> dict:
+    return dict(pair, responses=list(pair["responses"]))
+
+
+def is_layered(data: dict) -> bool:
+    return data.get("base") is not None
+
+
+def match_config(data: dict, session_name: str = None) -> MatchConfig:
+    """Sessiya faylidagi "matching" sozlamalari; qo'lda buzilgan bo'lsa standart sozlamalar.
+
+    Noto'g'ri scorer nomi yoki satr ko'rinishidagi chegara har bir xabarda auto_reply ichida
+    xato berardi, shuning uchun yuklashda tekshiriladi.
+    """
+    try:
+        config = MatchConfig.from_dict(data.get("matching"))
+        config.validate()
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.error(f"Invalid matching config{f' for {session_name}' if session_name else ''}, using defaults: {e}")
+        return DEFAULT_CONFIG
+    return config
+
+
+class BaseCorpus:
+    """Umumiy korpus: bitta nusxa, bitta matcher indeksi."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = None
+        self.by_question: dict = {}
+        self.bot = None
+        self.version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.data is not None
+
+    @property
+    def pairs(self) -> list:
+        return self.ensure_loaded()["data"]["pairs"]
+
+    def ensure_loaded(self) -> dict:
+        if self.data is None:
+            self._set(load_json(self.path, {"data": {"pairs": []}}))
+        return self.data
+
+    async def load(self):
+        self._set(await asyncio.to_thread(load_json, self.path, {"data": {"pairs": []}}))
+        logger.info(f"Base corpus loaded: {len(self.data['data']['pairs'])} pairs")
+
+    def _set(self, data: dict):
+        self.data = data
+        self.by_question = {pair["question"]: pair for pair in data["data"]["pairs"]}
+        self.bot = CustomChatBot(data=data)
+        self.version += 1
+
+    def materialize(self, doc: dict) -> dict:
+        """Fayldagi overlayni bazaga qo'llab, to'liq ko'rinishni qaytaradi (juftliklar nusxalanadi)."""
+        if "overlay" not in doc:
+            return doc
+        overlay = doc["overlay"]
+        tombstones = set(overlay.get("tombstones", []))
+        upserts = {pair["question"]: pair for pair in overlay.get("upserts", [])}
+        pairs = []
+        for pair in self.pairs:
+            question = pair["question"]
+            if question in tombstones:
+                continue
+            pairs.append(upserts.pop(question) if question in upserts else copy_pair(pair))
+        pairs.extend(upserts.values())
+        data = {key: value for key, value in doc.items() if key != "overlay"}
+        data["base"] = doc.get("base") or BASE_NAME
+        data["data"] = {"pairs": pairs}
+        return data
+
+    def overlay_of(self, data: dict) -> dict:
+        """To'liq ko'rinishdan bazaga nisbatan farqni hisoblaydi."""
+        self.ensure_loaded()
+        seen = set()
+        upserts = []
+        for pair in data["data"]["pairs"]:
+            question = pair["question"]
+            seen.add(question)
+            base_pair = self.by_question.get(question)
+            if base_pair is None or base_pair["responses"] != pair["responses"]:
+                upserts.append(copy_pair(pair))
+        tombstones = [question for question in self.by_question if question not in seen]
+        return {"upserts": upserts, "tombstones": tombstones}
+
+    def to_stored(self, data: dict) -> dict:
+        """Faylga yoziladigan ko'rinish (faqat overlay)."""
+        stored = {key: value for key, value in data.items() if key != "data"}
+        stored["overlay"] = self.overlay_of(data)
+        return stored
+
+    def new_session_data(self) -> dict:
+        return self.materialize({"base": BASE_NAME, "overlay": {"upserts": [], "tombstones": []}})
+
+    def build_bot(self, data: dict, session_name: str = None) -> CustomChatBot:
+        """Sessiya boti: overlay uchun kichik indeks + umumiy baza indeksi."""
+        config = match_config(data, session_name)
+        if not is_layered(data):
+            return CustomChatBot(data=data, config=config)
+        overlay = self.overlay_of(data)
+        return CustomChatBot(data={"data": {"pairs": overlay["upserts"]}}, base=self.bot,
+                             excluded=overlay["tombstones"], config=config)
+
+    async def broadcast(self, operation: str, **kwargs):
+        """Bazani bir marta o'zgartiradi va uni meros qilib olgan barcha sessiyalarga yetkazadi.
+
+        Sessiya o'zi o'zgartirgan (yoki o'chirgan) savollar tegilmaydi.
+        Qaytaradi: (modify_data natijasi, yangilangan sessiyalar, o'z nusxasi saqlangan sessiyalar).
+        """
+        async with self._lock:
+            self.ensure_loaded()
+            self._check(operation, **kwargs)
+            touched = {q for q in (kwargs.get("question"), kwargs.get("new_question")) if q is not None}
+            before = {q: copy_pair(self.by_question[q]) for q in touched if q in self.by_question}
+
+            # Nusxada o'zgartiramiz: muvaffaqiyatsiz operatsiya bazada iz qoldirmasin
+            draft = {"data": {"pairs": [copy_pair(pair) for pair in self.data["data"]["pairs"]]}}
+            result = modify_data(draft, operation, **kwargs)
+            if not (result[0] if isinstance(result, tuple) else result):
+                return result, [], []
+            rebuild = duplicates_changed(self.data["data"]["pairs"], draft["data"]["pairs"])
+            self.data["data"]["pairs"] = draft["data"]["pairs"]
+
+            self.by_question = {pair["question"]: pair for pair in self.data["data"]["pairs"]}
+            after = {q: self.by_question[q] for q in touched if q in self.by_question}
+            if rebuild:
+                # Takror savollar bir indeks kalitini bo'lishadi - farq o'rniga to'liq (joyida) qayta quramiz
+                self.bot.reindex(self.data["data"]["pairs"])
+            else:
+                self.bot.apply_diff(diff_pairs(list(before.values()), list(after.values())))
+            self.version += 1
+            snapshot = {"data": {"pairs": [copy_pair(pair) for pair in self.data["data"]["pairs"]]}}
+            await asyncio.to_thread(save_json, self.path, snapshot)
+
+        updated, overridden = await self._propagate(touched, before, after)
+        return result, updated, overridden
+
+    def _check(self, operation: str, question: str = None, new_question: str = None, response_index: int = None,
+               **kwargs):
+        """Barcha sessiyalarga tarqaladigan buzilishlarni o'zgartirishdan oldin rad etadi."""
+        taken = {q.lower() for q in self.by_question}
+        if operation == "add_question" and question.lower() in taken:
+            raise BaseEditError(f"Question '{question}' already exists in base", 409)
+        if (operation == "edit_question" and new_question.lower() != question.lower()
+                and new_question.lower() in taken):
+            raise BaseEditError(f"Question '{new_question}' already exists in base", 409)
+        if operation == "delete_response":
+            pair = self.by_question.get(question)
+            if pair is not None and 0 <= response_index < len(pair["responses"]) and len(pair["responses"]) == 1:
+                # Aks holda savol har bir meros sessiyada mos keladi, lekin bo'sh javob beradi
+                raise BaseEditError("Cannot delete last response (delete the question instead)")
+
+    async def _propagate(self, touched: set, before: dict, after: dict):
+        from persistence import store
+        from search import search_index
+        from utils import session_data_cache, update_stats_cache
+
+        updated, overridden = [], []
+        # Keshda bo'lmagan sessiyalar yuklanganda yangi bazadan avtomatik to'liq ko'rinish oladi
+        for name in set(search_index.sessions) - set(session_data_cache.keys()):
+            data = await store.load(name)
+            if data is not None and is_layered(data):
+                search_index.index_session(name, data["data"]["pairs"])
+                update_stats_cache(name, data["data"]["pairs"])
+                updated.append(name)
+
+        for name, data in list(session_data_cache.items()):
+            if not is_layered(data) or name in updated:
+                continue
+            pairs = data["data"]["pairs"]
+            positions = {pair["question"]: i for i, pair in enumerate(pairs) if pair["question"] in touched}
+            changed = False
+            for question in touched:
+                old, new = before.get(question), after.get(question)
+                index = positions.get(question)
+                current = pairs[index] if index is not None else None
+                inherits = (current is None and old is None) or (
+                    current is not None and old is not None and current["responses"] == old["responses"])
+                if not inherits:
+                    overridden.append(name)
+                    continue
+                if new is None and current is not None:
+                    pairs[index] = None
+                elif new is not None and current is None:
+                    pairs.append(copy_pair(new))
+                elif new is not None:
+                    current["responses"] = list(new["responses"])
+                else:
+                    continue
+                changed = True
+            if changed:
+                data["data"]["pairs"] = [pair for pair in pairs if pair is not None]
+                update_stats_cache(name, data["data"]["pairs"])
+                search_index.update_questions(name, data["data"]["pairs"], touched)
+                updated.append(name)
+        return updated, sorted(set(overridden))
+
+
+base_corpus = BaseCorpus(DEFAULT_DATA_PATH)
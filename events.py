@@ -0,0 +1,98 @@
+# events.py
+#
+# Dashboard uchun jonli hodisalar oqimi (GET /events - SSE, /ws/events - WebSocket).
+# `publish` sinxron va bloklamaydi: hodisa har bir obunachining chegaralangan navbatiga
+# qo'yiladi, navbat to'lsa eng eski hodisa tashlanadi. Sekin mijoz javob yo'lini ushlab turolmaydi.
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from config import EVENTS_BUFFER, EVENTS_REPLAY, get_logger
+
+logger = get_logger("events")
+
+
+class Subscriber:
+    def __init__(self, bus, types: set = None, session_name: str = None, buffer: int = EVENTS_BUFFER):
+        self.bus = bus
+        self.types = types
+        self.session_name = session_name
+        self.queue = deque(maxlen=buffer)
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def matches(self, event: dict) -> bool:
+        if self.session_name is not None and event.get("session") not in (None, self.session_name):
+            return False
+        # "reply" filtri "reply.sent" va "reply.skipped" ni ham qamrab oladi
+        return self.types is None or event["type"] in self.types or event["type"].split(".")[0] in self.types
+
+    def push(self, event: dict):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float = None) -> list:
+        """Yig'ilgan hodisalarni qaytaradi; bo'lmasa `timeout` gacha kutadi (bo'sh ro'yxat - heartbeat)."""
+        if not self.queue and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        events = list(self.queue)
+        self.queue.clear()
+        return events
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class EventBus:
+    def __init__(self, replay: int = EVENTS_REPLAY):
+        self._subscribers: set = set()
+        self._ids = itertools.count(1)
+        # Qayta ulanganda (Last-Event-ID) o'tkazib yuborilganlarni yuborish uchun
+        self._recent = deque(maxlen=replay)
+        self.published = 0
+
+    def publish(self, event_type: str, session_name: str = None, **data):
+        event = {"id": next(self._ids), "type": event_type, "ts": round(time.time(), 3), "session": session_name,
+                 "data": data}
+        self._recent.append(event)
+        self.published += 1
+        for subscriber in self._subscribers:
+            if subscriber.matches(event):
+                subscriber.push(event)
+        return event
+
+    def subscribe(self, types: set = None, session_name: str = None, last_event_id: int = None) -> Subscriber:
+        subscriber = Subscriber(self, types, session_name)
+        if last_event_id is not None:
+            for event in self._recent:
+                if event["id"] > last_event_id and subscriber.matches(event):
+                    subscriber.push(event)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        subscriber.close()
+        if subscriber.dropped:
+            logger.info("Event subscriber closed, %d events dropped (slow consumer)", subscriber.dropped)
+
+    def close_all(self):
+        for subscriber in list(self._subscribers):
+            self.unsubscribe(subscriber)
+
+    def metrics(self) -> dict:
+        return {"subscribers": len(self._subscribers), "published": self.published,
+                "dropped": sum(subscriber.dropped for subscriber in self._subscribers),
+                "buffered": sum(len(subscriber.queue) for subscriber in self._subscribers)}
+
+
+event_bus = EventBus()
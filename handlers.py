@@ -1,30 +1,135 @@
 #handlers.py
 
+import asyncio
+import os
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from utils import load_json, update_stats_cache, session_data_cache, get_session_data_path
-from config import logger, DIRS
-from ai.response import CustomChatBot
+from utils import (load_json, update_stats_cache, session_data_cache, is_own_write, diff_pairs, is_empty_diff,
+                   apply_stats_diff)
+from config import DIRS, WATCH_DEBOUNCE, get_logger
+from corpus import base_corpus, match_config
+from search import search_index
+from events import event_bus
+
+logger = get_logger("watcher")
 
 observers: dict = {}
 session_bots: dict = {}
 
+DATA_SUFFIX = "_data.json"
+
+
 class FileChangeHandler(FileSystemEventHandler):
-    def __init__(self, session_name: str):
-        self.session_name = session_name
+    """DATA_DIR dagi barcha `<session>_data.json` fayllari uchun yagona handler.
+
+    Watchdog threadidan kelgan hodisalar event loopga uzatiladi va har bir fayl
+    uchun WATCH_DEBOUNCE soniya ichidagi hodisalar bitta qayta yuklashga birlashtiriladi.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, debounce: float = WATCH_DEBOUNCE):
+        self.loop = loop
+        self.debounce = debounce
+        self._pending: dict = {}
 
     def on_modified(self, event):
-        if not event.is_directory and event.src_path == get_session_data_path(self.session_name):
-            try:
-                data = load_json(event.src_path)
-                session_data_cache[self.session_name] = data
-                update_stats_cache(self.session_name, data["data"]["pairs"])
-                logger.info(f"Cache updated for {self.session_name}")
-            except Exception as e:
-                logger.error(f"Cache update error for {self.session_name}: {e}")
+        self._dispatch(event, event.src_path)
+
+    def on_created(self, event):
+        self._dispatch(event, event.src_path)
+
+    def on_moved(self, event):
+        # Atomik almashtirish (tmp -> data.json) shu hodisa bilan keladi
+        self._dispatch(event, event.dest_path)
+
+    def _dispatch(self, event, path: str):
+        if event.is_directory or not path.endswith(DATA_SUFFIX):
+            return
+        session_name = os.path.basename(path)[:-len(DATA_SUFFIX)]
+        self.loop.call_soon_threadsafe(self._schedule, session_name, path)
+
+    def _schedule(self, session_name: str, path: str):
+        handle = self._pending.pop(session_name, None)
+        if handle is not None:
+            handle.cancel()
+        self._pending[session_name] = self.loop.call_later(self.debounce, self._fire, session_name, path)
+
+    def _fire(self, session_name: str, path: str):
+        self._pending.pop(session_name, None)
+        asyncio.ensure_future(reload_session_file(session_name, path), loop=self.loop)
+
+
+async def reload_session_file(session_name: str, path: str):
+    """Tashqaridan o'zgartirilgan faylni o'qib, kesh, statistika va indeksni farq bo'yicha yangilaydi."""
+    if not os.path.exists(path) or is_own_write(path):
+        return
+    from persistence import store
+    if store.has_pending(session_name):
+        # Ilovadagi saqlanmagan o'zgarishlar ustun: ular baribir faylni qayta yozadi
+        logger.warning(f"{session_name} faylidagi tashqi o'zgarish e'tiborsiz qoldirildi: saqlanmagan tahrirlar bor")
+        return
+    try:
+        data = base_corpus.materialize(await asyncio.to_thread(load_json, path))
+        new_pairs = data["data"]["pairs"]
+    except Exception as e:
+        # Muharrir faylni hali to'liq yozmagan bo'lishi mumkin; keyingi hodisa qayta urinadi
+        logger.error(f"Cache update error for {session_name}: {e}")
+        return
+
+    cached = session_data_cache.get(session_name)
+    if cached is None:
+        session_data_cache[session_name] = data
+        update_stats_cache(session_name, new_pairs)
+        search_index.index_session(session_name, new_pairs)
+        if session_name in session_bots:
+            session_bots[session_name] = base_corpus.build_bot(data, session_name)
+        logger.info(f"Cache loaded for {session_name}")
+        event_bus.publish("data.reloaded", session_name, pairs=len(new_pairs))
+        return
+
+    diff = diff_pairs(cached["data"]["pairs"], new_pairs)
+    session_data_cache[session_name] = data
+    if session_name in session_bots:
+        # "matching" sozlamalari juftliklarsiz ham o'zgarishi mumkin
+        session_bots[session_name].config = match_config(data, session_name)
+    if is_empty_diff(diff):
+        return
+    apply_stats_diff(session_name, new_pairs, diff)
+    if diff["rebuild"]:
+        search_index.index_session(session_name, new_pairs)
+    else:
+        search_index.apply_diff(session_name, diff)
+    bot = session_bots.get(session_name)
+    if bot is not None and bot.base is None and not diff["rebuild"]:
+        bot.apply_diff(diff)
+    elif bot is not None:
+        # Overlay boti kichik: farqni hisoblash o'rniga qayta quramiz (baza indeksi umumiy qoladi)
+        session_bots[session_name] = base_corpus.build_bot(data, session_name)
+    logger.info(f"Cache updated for {session_name}: +{len(diff['added'])} -{len(diff['removed'])} "
+                f"~{len(diff['changed'])}")
+    event_bus.publish("data.reloaded", session_name, added=len(diff["added"]), removed=len(diff["removed"]),
+                      changed=len(diff["changed"]))
+
+
+def start_data_watcher(loop: asyncio.AbstractEventLoop = None):
+    """DATA_DIR uchun yagona watchdog observerini ishga tushiradi."""
+    if "data" in observers:
+        return observers["data"]
+    handler = FileChangeHandler(loop or asyncio.get_running_loop())
+    observer = Observer()
+    observer.schedule(handler, DIRS["data"], recursive=False)
+    observer.daemon = True
+    observer.start()
+    observers["data"] = observer
+    logger.info(f"Watching {DIRS['data']} for data file changes")
+    return observer
+
 
 async def update_session_bot(session_name: str, session_data_path: str):
-    session_bots[session_name] = CustomChatBot(session_data_path)
-    from client_manager import start_client, active_clients
-    if session_name in active_clients:
-        await start_client(session_name)
\ No newline at end of file
+    # Fayl hali saqlanmagan bo'lishi mumkin, shuning uchun keshdagi ma'lumotdan foydalanamiz.
+    # auto_reply botni har safar session_bots dan oladi, shuning uchun mijozni qayta ishga tushirish shart emas.
+    from persistence import store
+    data = await store.load(session_name)
+    if data is None:
+        logger.warning(f"{session_name} uchun ma'lumot topilmadi: {session_data_path}")
+        return
+    session_bots[session_name] = base_corpus.build_bot(data, session_name)
@@ -0,0 +1,237 @@
+# lifecycle.py
+#
+# Jarayon holati (starting -> ready -> draining -> stopped), yuborilmagan javoblar reestri
+# va sessiyalarni yangi jarayonga birma-bir topshirish (handoff).
+#
+# Handoff: yangi jarayon HANDOFF_FROM manzilidagi eski jarayondan har bir sessiyani
+# POST /admin/handoff/release/{session} orqali so'raydi. Eski jarayon shu sessiya uchun
+# yangi xabarlarni qabul qilmaydi, kutayotgan javoblarni DRAIN_TIMEOUT ichida yuboradi,
+# ulgurmaganlarini javobda qaytaradi va mijozni to'xtatadi. Yangi jarayon sessiyani
+# ishga tushirib, qaytarilgan javoblarni yuboradi.
+
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from config import DRAIN_TIMEOUT, PENDING_REPLIES_FILE, PENDING_REPLY_MAX_AGE, HANDOFF_FROM, HANDOFF_TIMEOUT, get_logger
+from utils import load_json, save_json
+from events import event_bus
+from persistence import store
+from scheduler import scheduler
+
+logger = get_logger("lifecycle")
+
+# HANDOFF: sessiyalar yangi jarayonga o'tkazilmoqda - readiness yo'q, lekin hali topshirilmagan
+# sessiyalar javob berishda davom etadi
+STARTING, READY, HANDOFF, DRAINING, STOPPED = "starting", "ready", "handoff", "draining", "stopped"
+
+
+class HandoffError(Exception):
+    """Sessiyani topshirib bo'lmadi (masalan, kutilayotgan tahrirlar diskka yozilmadi)."""
+
+
+@dataclass
+class PendingReply:
+    session_name: str
+    chat_id: int
+    text: str
+    reply_to_message_id: int = None
+    created_at: float = field(default_factory=time.time)
+    # Drain vaqti tugab, javob faylga/yangi jarayonga o'tkazilgan bo'lsa, bu jarayon uni yubormaydi
+    abandoned: bool = False
+    finished: asyncio.Event = field(default_factory=asyncio.Event, repr=False, compare=False)
+
+    def to_dict(self) -> dict:
+        return {"session_name": self.session_name, "chat_id": self.chat_id, "text": self.text,
+                "reply_to_message_id": self.reply_to_message_id, "created_at": self.created_at}
+
+
+class Lifecycle:
+    """Jarayon holati va hali yuborilmagan javoblar (scheduler navbatida kutayotganlar)."""
+
+    def __init__(self, drain_timeout: float = DRAIN_TIMEOUT):
+        self.drain_timeout = drain_timeout
+        self.state = STARTING
+        self.started_at = time.time()
+        self.released: set = set()
+        self._inflight: dict = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def draining(self) -> bool:
+        return self.state in (DRAINING, STOPPED)
+
+    def mark_ready(self):
+        if self.state == STARTING:
+            self._set_state(READY)
+
+    def accepts(self, session_name: str) -> bool:
+        """Yangi xabarga javob berish mumkinmi (drain yoki topshirilgan sessiya uchun - yo'q)."""
+        return not self.draining and session_name not in self.released
+
+    # --- Reestr ---
+
+    def track(self, session_name: str, chat_id: int, text: str, reply_to_message_id: int = None) -> PendingReply:
+        """Javobni reestrga qo'shadi; sessiya allaqachon topshirilgan bo'lsa None.
+
+        `accepts()` tekshiruvidan keyin, lekin `release()` snapshotidan so'ng yetib kelgan javob
+        eski jarayondan yuborilmasligi uchun.
+        """
+        if session_name in self.released:
+            return None
+        reply = PendingReply(session_name, chat_id, text, reply_to_message_id)
+        self._inflight[id(reply)] = reply
+        return reply
+
+    def done(self, reply: PendingReply):
+        reply.finished.set()
+        self._inflight.pop(id(reply), None)
+
+    def pending(self, session_name: str = None) -> list:
+        return [reply for reply in self._inflight.values()
+                if session_name is None or reply.session_name == session_name]
+
+    async def _settle(self, replies: list, timeout: float) -> list:
+        """Javoblarni kechikishsiz navbatga chiqarib, `timeout` ichida yuborilishini kutadi;
+        ulgurmaganlarini qaytaradi.
+
+        Navbatdagi ishlar bekor qilinmaydi - faqat `abandoned` belgilanadi va scheduler ularni
+        yubormaydi. Yuborish allaqachon boshlangan javob ikki marta yetib borishi mumkin
+        (kamida bir marta yetkazish).
+        """
+        for session_name in {reply.session_name for reply in replies}:
+            scheduler.expedite(session_name)
+        waiters = [asyncio.ensure_future(reply.finished.wait()) for reply in replies]
+        if waiters:
+            await asyncio.wait(waiters, timeout=timeout)
+            for waiter in waiters:
+                waiter.cancel()
+        left = [reply for reply in replies if not reply.finished.is_set()]
+        for reply in left:
+            reply.abandoned = True
+            self.done(reply)
+        return left
+
+    # --- Drain ---
+
+    async def drain(self, timeout: float = None) -> dict:
+        """Yangi ishni to'xtatadi va kutayotgan javoblarni yuboradi; ulgurmaganlari faylga yoziladi."""
+        if self.state == STOPPED:
+            return {"sent": 0, "persisted": 0}
+        self._set_state(DRAINING)
+        timeout = self.drain_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        logger.info(f"Draining: {len(self.pending())} pending replies, {scheduler.pending()} queued jobs, "
+                    f"timeout {timeout}s")
+        # Navbatdagi xabarlar moslashtirilib, yangi javoblar paydo bo'lishi mumkin - ularni ham kutamiz
+        total, left = 0, []
+        while time.monotonic() < deadline and (self.pending() or scheduler.pending()):
+            replies = self.pending()
+            if not replies:
+                await asyncio.sleep(0.05)
+                continue
+            total += len(replies)
+            left += await self._settle(replies, max(0.0, deadline - time.monotonic()))
+        replies = self.pending()
+        total += len(replies)
+        left += await self._settle(replies, 0)
+        if left:
+            await asyncio.to_thread(persist_replies, left)
+            logger.warning(f"{len(left)} replies not sent before drain timeout, saved to {PENDING_REPLIES_FILE}")
+        self._set_state(STOPPED)
+        # SSE/WebSocket oqimlari tugaydi, aks holda server ularni kutib qoladi
+        event_bus.close_all()
+        return {"sent": total - len(left), "persisted": len(left)}
+
+    async def release(self, session_name: str, timeout: float = None) -> list:
+        """Handoff: sessiyani yangi jarayonga topshirish uchun bo'shatadi, yuborilmagan javoblarni qaytaradi."""
+        from client_manager import stop_client
+        if self.state == READY:
+            self._set_state(HANDOFF)
+        self.released.add(session_name)
+        left = await self._settle(self.pending(session_name), self.drain_timeout if timeout is None else timeout)
+        # Yangi jarayon sessiya faylini o'qiydi: kechiktirilgan tahrirlar undan oldin diskda bo'lishi kerak
+        try:
+            await store.flush(session_name)
+        except Exception as e:
+            # Sessiya shu jarayonda qoladi; ulgurmagan javoblarni o'zimiz yuboramiz
+            self.released.discard(session_name)
+            if self.state == HANDOFF and not self.released:
+                self._set_state(READY)
+            await send_replies([reply.to_dict() for reply in left])
+            logger.error(f"Handoff of {session_name} aborted, pending edits not saved: {e}")
+            raise HandoffError(f"Failed to save {session_name} data: {e}") from e
+        await stop_client(session_name)
+        logger.info(f"{session_name} handed off ({len(left)} unsent replies transferred)")
+        event_bus.publish("session.released", session_name, transferred=len(left))
+        return [reply.to_dict() for reply in left]
+
+    def _set_state(self, state: str):
+        self.state = state
+        event_bus.publish("server.state", state=state)
+
+    def status(self) -> dict:
+        return {"state": self.state, "uptime": round(time.time() - self.started_at, 1),
+                "pending_replies": len(self._inflight), "released": sorted(self.released)}
+
+
+def persist_replies(replies: list):
+    existing = load_json(PENDING_REPLIES_FILE, [])
+    save_json(PENDING_REPLIES_FILE, existing + [reply.to_dict() for reply in replies])
+
+
+def take_persisted_replies() -> list:
+    """Oldingi jarayon saqlagan javoblarni o'qiydi va faylni o'chiradi."""
+    replies = load_json(PENDING_REPLIES_FILE, [])
+    if os.path.exists(PENDING_REPLIES_FILE):
+        os.remove(PENDING_REPLIES_FILE)
+    return replies
+
+
+async def send_replies(replies: list):
+    """Saqlangan yoki topshirilgan javoblarni faol mijozlar orqali yuboradi (juda eskilari tashlanadi)."""
+    from client_manager import active_clients
+    now = time.time()
+    for reply in replies:
+        client = active_clients.get(reply["session_name"])
+        if client is None or now - reply.get("created_at", now) > PENDING_REPLY_MAX_AGE:
+            logger.warning(f"Dropping stale pending reply for {reply['session_name']} (chat {reply['chat_id']})")
+            continue
+        try:
+            await client.send_message(reply["chat_id"], reply["text"],
+                                      reply_to_message_id=reply.get("reply_to_message_id"))
+        except Exception as e:
+            logger.error(f"Pending reply for {reply['session_name']} failed: {e}")
+
+
+def _post_json(url: str, timeout: float) -> dict:
+    request = urllib.request.Request(url, method="POST", data=b"")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read() or b"{}")
+
+
+async def request_handoff(session_name: str, source: str = HANDOFF_FROM) -> list:
+    """Eski jarayondan sessiyani so'raydi; u ulgurmagan javoblarni qaytaradi.
+
+    Eski jarayon javob bermasa (allaqachon to'xtagan bo'lsa) bo'sh ro'yxat qaytariladi;
+    sessiyani berishni rad etsa HandoffError.
+    """
+    url = f"{source.rstrip('/')}/admin/handoff/release/{session_name}"
+    try:
+        result = await asyncio.to_thread(_post_json, url, HANDOFF_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        # Eski jarayon ishlayapti, lekin sessiyani bermadi - u yerda qoladi
+        raise HandoffError(f"{source} refused to release {session_name}: HTTP {e.code}") from e
+    except Exception as e:
+        logger.warning(f"Handoff for {session_name} from {source} failed, starting anyway: {e}")
+        return []
+    return result.get("pending", [])
+
+
+lifecycle = Lifecycle()
@@ -0,0 +1,128 @@
+# logging_setup.py
+#
+# Log yozuvlari event loopda faqat navbatga qo'yiladi; stdout/faylga yozish alohida
+# QueueListener threadida bajariladi. Har bir quyi tizim o'z loggeriga ega
+# ("torex.routes", "torex.persistence", ...) va darajasi LOG_LEVELS orqali sozlanadi:
+#   LOG_LEVEL=INFO
+#   LOG_LEVELS=persistence=WARNING,messages=DEBUG
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import reprlib
+
+ROOT = "torex"
+# LOG_LEVELS da shu nomlar bilan boshlanganlar tashqi kutubxona loggerlari (prefikssiz)
+EXTERNAL = ("uvicorn", "pyrogram", "httpx", "watchdog", "asyncio")
+
+# LogRecord ning standart atributlari: qolganlari `extra=` orqali berilgan maydonlar
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+# payload() uchun standart chegara (setup_logging da LOG_PAYLOAD_LIMIT bilan o'rnatiladi)
+payload_limit = 1000
+
+
+class JsonFormatter(logging.Formatter):
+    """Har bir yozuv - bitta JSON qator; `extra=` maydonlari ham qo'shiladi."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                 "msg": record.getMessage()}
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """INFO va undan pastdagi yozuvlarning faqat `rate` qismini o'tkazadi; WARNING+ har doim o'tadi."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class payload:
+    """Katta obyektlarni logga cheklangan hajmda chiqarish uchun.
+
+    Matnga faqat yozuv haqiqatan chiqarilganda aylantiriladi (`logger.debug("%s", payload(data))`),
+    va aylantirish ham chuqurlik/uzunlik bo'yicha cheklangan - megabaytli dict to'liq formatlanmaydi.
+    """
+
+    __slots__ = ("obj", "limit")
+    _repr = reprlib.Repr()
+    _repr.maxlevel = 4
+    _repr.maxdict = _repr.maxlist = _repr.maxtuple = _repr.maxset = 8
+    _repr.maxstring = _repr.maxother = 80
+
+    def __init__(self, obj, limit: int = None):
+        self.obj = obj
+        self.limit = limit or payload_limit
+
+    def __str__(self) -> str:
+        text = self._repr.repr(self.obj)
+        return text if len(text) <= self.limit else text[:self.limit] + "...[truncated]"
+
+    __repr__ = __str__
+
+
+def parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def get_logger(subsystem: str = None) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{subsystem}" if subsystem else ROOT)
+
+
+def setup_logging(level: str = "INFO", levels: str = "", fmt: str = "text", path: str = None,
+                  message_sample_rate: float = 1.0, payload_max: int = 1000):
+    """Root loggerga QueueHandler o'rnatadi va yozuvchi threadni ishga tushiradi (bir marta)."""
+    global _listener, payload_limit
+    if _listener is not None:
+        return
+    payload_limit = payload_max
+    if fmt == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handlers = [logging.StreamHandler()]
+    if path:
+        handlers.append(logging.handlers.RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5,
+                                                             encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    # QueueHandler xabarni chaqiruvchi threadda formatlaydi (obyektlar o'zgarib ketmasligi uchun),
+    # lekin I/O listener threadida bo'ladi
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, subsystem_level in parse_levels(levels).items():
+        logging.getLogger(name if name.startswith(EXTERNAL) else f"{ROOT}.{name}").setLevel(subsystem_level)
+    get_logger("messages").addFilter(SamplingFilter(message_sample_rate))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Navbatdagi yozuvlarni chiqarib, listener threadini to'xtatadi."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,190 @@
+# login_pool.py
+
+import asyncio
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from pyrogram import Client
+from config import API_ID, API_HASH, DIRS, LOGIN_TTL, LOGIN_MAX_PENDING, LOGIN_CLEANUP_INTERVAL, get_logger
+
+logger = get_logger("login")
+
+
+class LoginCapacityError(Exception):
+    pass
+
+
+@dataclass
+class PendingLogin:
+    phone_number: str
+    session_name: str
+    client: Client
+    phone_code_hash: str
+    created_at: float
+    # PENDING_DIR dagi vaqtinchalik nom; complete() da session_name ga ko'chiriladi
+    pending_name: str
+    expires_at: float
+    ip: str = None
+    requires_password: bool = False
+    # So'rov (sign_in / check_password) davom etayotganda muddati o'tgan deb uzilmaydi
+    busy: bool = False
+
+
+PENDING_DIR = os.path.join(DIRS["sessions"], ".pending")
+
+
+class LoginManager:
+    """/start_login -> /verify_code -> /verify_password oqimidagi kutilayotgan loginlar.
+
+    Har bir login PENDING_DIR da alohida nom bilan boshlanadi va faqat complete() da
+    sessions/ ga ko'chiriladi - shu raqamning mavjud sessiya fayliga tegilmaydi. Login
+    LOGIN_TTL soniyada tugallanmasa, mijoz uziladi va vaqtinchalik fayl o'chiriladi.
+    Bir vaqtda LOGIN_MAX_PENDING tadan ko'p login bo'lmaydi.
+    """
+
+    def __init__(self, ttl: float = LOGIN_TTL, max_pending: int = LOGIN_MAX_PENDING,
+                 cleanup_interval: float = LOGIN_CLEANUP_INTERVAL):
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.cleanup_interval = cleanup_interval
+        self._pending: dict = {}
+        self._cleanup_task = None
+        self.counters = {"started": 0, "completed": 0, "expired": 0, "failed": 0, "rejected": 0}
+
+    def __contains__(self, phone_number: str) -> bool:
+        return self.get(phone_number) is not None
+
+    def get(self, phone_number: str):
+        login = self._pending.get(phone_number)
+        if login is not None and not login.busy and login.expires_at <= time.monotonic():
+            # Muddati o'tgan: darhol tozalaymiz, foydalanuvchi qaytadan boshlashi kerak
+            asyncio.create_task(self._expire(phone_number))
+            return None
+        return login
+
+    async def begin(self, phone_number: str, ip: str = None) -> PendingLogin:
+        if phone_number in self._pending:
+            await self.discard(phone_number)
+        if len(self._pending) >= self.max_pending:
+            await self.sweep()
+        if len(self._pending) >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise LoginCapacityError(f"Too many pending logins ({self.max_pending})")
+
+        session_name = f"temp_{phone_number.replace('+', '')}"
+        pending_name = f"{session_name}_{secrets.token_hex(4)}"
+        os.makedirs(PENDING_DIR, exist_ok=True)
+        client = Client(pending_name, api_id=API_ID, api_hash=API_HASH, workdir=PENDING_DIR)
+        try:
+            await client.connect()
+            sent_code = await client.send_code(phone_number)
+        except BaseException:
+            self.counters["failed"] += 1
+            await self._close(client, pending_name, remove_session=True)
+            raise
+        now = time.monotonic()
+        login = PendingLogin(phone_number=phone_number, session_name=session_name, client=client,
+                             phone_code_hash=sent_code.phone_code_hash, created_at=now, expires_at=now + self.ttl,
+                             pending_name=pending_name, ip=ip)
+        self._pending[phone_number] = login
+        self.counters["started"] += 1
+        return login
+
+    def require_password(self, phone_number: str):
+        login = self._pending.get(phone_number)
+        if login is not None:
+            # 2FA bosqichi uchun yangi muddat
+            login.requires_password = True
+            login.expires_at = time.monotonic() + self.ttl
+
+    async def complete(self, phone_number: str):
+        """Muvaffaqiyatli login: mijozni uzadi va sessiya faylini doimiy nomiga ko'chiradi."""
+        login = self._pending.pop(phone_number, None)
+        if login is not None:
+            self.counters["completed"] += 1
+            await self._close(login.client, login.pending_name, remove_session=False)
+            for suffix in (".session", ".session-journal"):
+                source = os.path.join(PENDING_DIR, f"{login.pending_name}{suffix}")
+                target = os.path.join(DIRS["sessions"], f"{login.session_name}{suffix}")
+                if os.path.exists(source):
+                    os.replace(source, target)
+                elif suffix == ".session-journal" and os.path.exists(target):
+                    # Eski faylning journali yangi bazaga qo'llanmasin
+                    os.remove(target)
+
+    async def discard(self, phone_number: str, failed: bool = False):
+        login = self._pending.pop(phone_number, None)
+        if login is not None:
+            if failed:
+                self.counters["failed"] += 1
+            await self._close(login.client, login.pending_name, remove_session=True)
+
+    async def _expire(self, phone_number: str):
+        login = self._pending.get(phone_number)
+        if login is None or login.busy or login.expires_at > time.monotonic():
+            return
+        del self._pending[phone_number]
+        self.counters["expired"] += 1
+        logger.info(f"Login for {phone_number} expired after {self.ttl}s")
+        await self._close(login.client, login.pending_name, remove_session=True)
+
+    @staticmethod
+    async def _close(client: Client, pending_name: str, remove_session: bool):
+        try:
+            if client.is_connected:
+                await client.disconnect()
+            else:
+                # connect() yarim yo'lda to'xtagan bo'lsa ham sqlite fayli yopilishi kerak
+                await client.storage.close()
+        except Exception as e:
+            logger.warning(f"Login mijozini uzishda xato ({pending_name}): {e}")
+        if remove_session:
+            for suffix in (".session", ".session-journal"):
+                path = os.path.join(PENDING_DIR, f"{pending_name}{suffix}")
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Vaqtinchalik sessiya faylini o'chirib bo'lmadi ({path}): {e}")
+
+    async def sweep(self):
+        now = time.monotonic()
+        expired = [phone for phone, login in self._pending.items() if login.expires_at <= now]
+        await asyncio.gather(*[self._expire(phone) for phone in expired], return_exceptions=True)
+        return len(expired)
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Login tozalashda xato: {e}")
+
+    def start_cleanup(self):
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def shutdown(self):
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            await asyncio.gather(self._cleanup_task, return_exceptions=True)
+            self._cleanup_task = None
+        await asyncio.gather(*[self.discard(phone) for phone in list(self._pending)], return_exceptions=True)
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        ages = [now - login.created_at for login in self._pending.values()]
+        return {
+            "pending": len(self._pending),
+            "pending_password": sum(1 for login in self._pending.values() if login.requires_password),
+            "oldest_pending_age": round(max(ages), 3) if ages else 0.0,
+            "max_pending": self.max_pending,
+            "ttl": self.ttl,
+            **self.counters,
+        }
+
+
+login_manager = LoginManager()
@@ -4,22 +4,30 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from client_manager import start_client, active_clients
-from handlers import observers
+from handlers import observers, start_data_watcher
 from routes import router
-from middleware import rate_limit_middleware
+from middleware import rate_limit_middleware, tracing_middleware, drain_middleware, CompressionMiddleware
+from serialization import FastJSONResponse
+from tracing import tracer
+from profiles import start_profile_refresher, stop_profile_refresher
+from persistence import store
+from search import build_search_index
+from corpus import base_corpus
+from login_pool import login_manager
+from lifecycle import lifecycle, HandoffError, request_handoff, send_replies, take_persisted_replies
+from scheduler import scheduler
+from unmatched import unmatched_log
 import asyncio
 import uvicorn
-import logging
 from dotenv import load_dotenv
 import os
-from config import DIRS
+from config import DIRS, HANDOFF_FROM, DRAIN_TIMEOUT, get_logger
 
 # Load environment variables
 load_dotenv()
 
-# Logging setup
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Logging setup (config.py da: QueueHandler + LOG_LEVELS)
+logger = get_logger("main")
 
 # Rate limiting configuration from .env
 RATE_LIMIT = int(os.getenv("RATE_LIMIT", 100))
@@ -28,6 +36,10 @@ rate_limit_storage: dict = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await base_corpus.load()
+    # Javob yuboruvchi ishchilar mijozlardan oldin: birinchi xabarlar ham navbatga tushadi
+    scheduler.start()
+    await unmatched_log.start()
     sessions_dir = DIRS["sessions"]
     session_files = [f.replace(".session", "") for f in os.listdir(sessions_dir) if f.endswith(".session")]
 
@@ -35,17 +47,48 @@ async def lifespan(app: FastAPI):
         logger.info("No session files found in sessions directory")
     else:
         logger.info(f"Found session files: {session_files}")
-        tasks = [start_client(name) for name in session_files]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for name, result in zip(session_files, results):
-            if isinstance(result, Exception):
-                logger.error(f"Failed to start session {name}: {str(result)}")
-            else:
-                logger.info(f"Successfully started session {name}")
+        if HANDOFF_FROM:
+            # Eski jarayondan sessiyalarni birma-bir olamiz: har biri faqat qisqa vaqt oflayn bo'ladi
+            for name in session_files:
+                try:
+                    handed_over = await request_handoff(name)
+                except HandoffError as e:
+                    logger.error(f"Not starting session {name}: {e}")
+                    continue
+                try:
+                    await start_client(name)
+                except Exception as e:
+                    logger.error(f"Failed to start session {name}: {str(e)}")
+                    continue
+                await send_replies(handed_over)
+                logger.info(f"Took over session {name} from {HANDOFF_FROM}")
+        else:
+            tasks = [start_client(name) for name in session_files]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for name, result in zip(session_files, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to start session {name}: {str(result)}")
+                else:
+                    logger.info(f"Successfully started session {name}")
+    # Oldingi jarayon drain paytida yubora olmagan javoblar
+    await send_replies(await asyncio.to_thread(take_persisted_replies))
+
+    start_data_watcher()
+    search_task = asyncio.create_task(build_search_index())
+    start_profile_refresher()
+    login_manager.start_cleanup()
+    lifecycle.mark_ready()
 
     yield
 
-    # Cleanup
+    # Cleanup: avval yangi ishni to'xtatib, kutayotgan javoblarni yuboramiz (mijozlar hali ulangan)
+    await lifecycle.drain()
+    await scheduler.shutdown()
+    await stop_profile_refresher()
+    await login_manager.shutdown()
+    search_task.cancel()
+    await store.flush_all()
+    await unmatched_log.close()
     logger.info("Shutting down observers and clients")
     for observer in observers.values():
         try:
@@ -53,11 +96,17 @@ async def lifespan(app: FastAPI):
             observer.join()
         except Exception as e:
             logger.error(f"Error stopping observer: {e}")
+    observers.clear()
     await asyncio.gather(*[client.stop() for client in active_clients.values()], return_exceptions=True)
+    tracer.flush()
     logger.info("Shutdown complete")
 
 # Initialize FastAPI app
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Javoblarni siqish. Eng ichki middleware bo'lishi kerak (birinchi qo'shiladi): tashqi
+# "http" middlewarelar javobni bo'laklab uzatadi, siqish esa butun javobni ko'radi
+app.add_middleware(CompressionMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -71,10 +120,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request tracing (TRACE_ENABLED / X-Trace sarlavhasi)
+app.middleware("http")(tracing_middleware)
+# Drain paytida yangi so'rovlarga 503 (health checklar va handoff bundan mustasno)
+app.middleware("http")(drain_middleware)
+
 # Include routes
 app.include_router(router)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    # Ochiq SSE/WebSocket ulanishlari to'xtashni cheksiz ushlab turmasligi uchun
+    uvicorn.run(app, host="0.0.0.0", port=8001, timeout_graceful_shutdown=int(DRAIN_TIMEOUT))
     #.run(app, port=8001)
     #uvicorn.run(app)
\ No newline at end of file
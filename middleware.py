@@ -1,9 +1,21 @@
 # middleware.py
 
+import asyncio
+import gzip
 from fastapi import Request, HTTPException
-from config import RATE_LIMIT, TIME_WINDOW, logger
+from fastapi.responses import JSONResponse
+from config import RATE_LIMIT, TIME_WINDOW, COMPRESS_MIN_SIZE, COMPRESS_LEVEL, get_logger
+from tracing import tracer
+from lifecycle import lifecycle
 import time
 
+try:
+    import brotli
+except ImportError:  # ixtiyoriy: bo'lmasa faqat gzip
+    brotli = None
+
+logger = get_logger("http")
+
 rate_limit_storage: dict = {}
 
 async def rate_limit_middleware(request: Request, call_next):
@@ -19,4 +31,103 @@ async def rate_limit_middleware(request: Request, call_next):
     else:
         count += 1
     rate_limit_storage[key] = (count, start_time)
-    return await call_next(request)
\ No newline at end of file
+    return await call_next(request)
+
+async def tracing_middleware(request: Request, call_next):
+    # "X-Trace: 1" sarlavhasi bilan so'rovni majburan namunaga olish mumkin
+    force = request.headers.get("x-trace") == "1"
+    with tracer.span(f"{request.method} {request.url.path}", force=force) as span:
+        response = await call_next(request)
+        if span is not None:
+            route = request.scope.get("route")
+            if route is not None:
+                span.name = f"{request.method} {route.path}"
+            span.set(status_code=response.status_code)
+            response.headers["X-Trace-Id"] = span.trace_id
+        return response
+
+# Drain paytida ham javob beradigan yo'llar (health checklar va handoff)
+DRAIN_EXEMPT = ("/healthz", "/readyz", "/admin/handoff/")
+
+async def drain_middleware(request: Request, call_next):
+    path = request.url.path
+    if lifecycle.draining and not path.startswith(DRAIN_EXEMPT):
+        return JSONResponse(status_code=503, content={"detail": "Server is draining"}, headers={"Retry-After": "5"})
+    return await call_next(request)
+
+# Siqiladigan kontent turlari (rasmlar va zip allaqachon siqilgan)
+COMPRESSIBLE = ("application/json", "text/", "application/javascript")
+# Bundan katta javoblar event loopni to'sib qo'ymasligi uchun threadda siqiladi
+COMPRESS_IN_THREAD = 256 * 1024
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level)
+
+
+class CompressionMiddleware:
+    """COMPRESS_MIN_SIZE dan katta javoblarni brotli (o'rnatilgan bo'lsa) yoki gzip bilan siqadi.
+
+    Faqat bir bo'lakli (streaming bo'lmagan) javoblar siqiladi; FileResponse/StreamingResponse
+    o'zgarishsiz o'tadi.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE, level: int = COMPRESS_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    def _encoding(self, scope) -> str:
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1").lower()
+        if brotli is not None and "br" in accept:
+            return "br"
+        if "gzip" in accept:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = self._encoding(scope)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            headers = {key.lower(): value for key, value in start["headers"]}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if (message.get("more_body") or len(body) < self.minimum_size or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE)):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            if len(body) > COMPRESS_IN_THREAD:
+                compressed = await asyncio.to_thread(_compress, body, encoding, self.level)
+            else:
+                compressed = _compress(body, encoding, self.level)
+            raw_headers = [(key, value) for key, value in start["headers"]
+                           if key.lower() not in (b"content-length", b"vary")]
+            vary = headers.get(b"vary")
+            raw_headers += [(b"content-encoding", encoding.encode()),
+                            (b"content-length", str(len(compressed)).encode()),
+                            (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding")]
+            await send({**start, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, wrapped_send)
@@ -29,4 +29,19 @@ class EditQuestionRequest(BaseModel):
 
 class SessionDataRequest(BaseModel):
     session_name: str
-    data: dict
\ No newline at end of file
+    data: dict
+
+class BroadcastEditRequest(BaseModel):
+    operation: str
+    question: str = None
+    new_question: str = None
+    responses: List[str] = None
+    response: str = None
+    response_index: int = None
+
+class MatchingConfigRequest(BaseModel):
+    threshold: float = None
+    prefilter_cutoff: float = None
+    max_candidates: int = None
+    rescorers: List[str] = None
+    rescore_threshold: float = None
@@ -0,0 +1,170 @@
+# persistence.py
+
+import asyncio
+import os
+from config import PERSIST_DELAY, PERSIST_MAX_DELAY, PERSIST_MAX_RETRIES, get_logger
+from utils import load_json, save_json, get_session_data_path, session_data_cache
+from tracing import tracer
+from corpus import base_corpus, is_layered
+from events import event_bus
+
+logger = get_logger("persistence")
+
+
+def _snapshot(obj):
+    """Faqat dict/listlarni nusxalaydi (satrlar o'zgarmas) - fon threadida xavfsiz seriyalash uchun."""
+    if isinstance(obj, dict):
+        return {key: _snapshot(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_snapshot(value) for value in obj]
+    return obj
+
+
+class SessionStore:
+    """Sessiya ma'lumotlarini o'qish/yozish; fayl I/O event loopdan tashqarida bajariladi.
+
+    `mark_dirty` bir necha marta chaqirilsa ham sessiya fayli PERSIST_DELAY soniyalik
+    sukunatdan keyin (lekin birinchi o'zgarishdan PERSIST_MAX_DELAY soniyadan kechiktirmay)
+    bir marta yoziladi.
+    """
+
+    def __init__(self, delay: float = PERSIST_DELAY, max_delay: float = PERSIST_MAX_DELAY,
+                 max_retries: int = PERSIST_MAX_RETRIES):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        # Ketma-ket yozish xatolari soni va urinishlar tugagach saqlanmay qolgan ma'lumot
+        self._failures: dict = {}
+        self.failed: dict = {}
+        self._dirty: dict = {}
+        self._deadlines: dict = {}
+        self._timers: dict = {}
+        self._locks: dict = {}
+        self._tasks: set = set()
+
+    def _lock(self, session_name: str) -> asyncio.Lock:
+        lock = self._locks.get(session_name)
+        if lock is None:
+            lock = self._locks[session_name] = asyncio.Lock()
+        return lock
+
+    async def load(self, session_name: str) -> dict:
+        data = session_data_cache.get(session_name)
+        if data is None:
+            with tracer.span("json.load", session=session_name):
+                data = await asyncio.to_thread(load_json, get_session_data_path(session_name), None)
+            if data is None:
+                return None
+            data = base_corpus.materialize(data)
+            # Kutish paytida boshqa so'rov keshni to'ldirgan bo'lishi mumkin
+            data = session_data_cache.setdefault(session_name, data)
+        return data
+
+    def has_pending(self, session_name: str) -> bool:
+        return session_name in self._dirty
+
+    def mark_dirty(self, session_name: str, data: dict, retry: bool = False):
+        if not retry:
+            # Yangi tahrir: qayta urinishlar hisobi boshidan
+            self._failures.pop(session_name, None)
+            self.failed.pop(session_name, None)
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self._dirty[session_name] = data
+        deadline = self._deadlines.setdefault(session_name, now + self.max_delay)
+        timer = self._timers.pop(session_name, None)
+        if timer is not None:
+            timer.cancel()
+        self._timers[session_name] = loop.call_later(max(0.0, min(self.delay, deadline - now)),
+                                                     self._spawn_flush, session_name)
+
+    def _spawn_flush(self, session_name: str):
+        self._timers.pop(session_name, None)
+        task = asyncio.create_task(self.flush(session_name))
+        self._tasks.add(task)
+        task.add_done_callback(self._flushed)
+
+    def _flushed(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        # Xato _write/flush da allaqachon loglangan - "exception was never retrieved" bo'lmasin
+        if not task.cancelled():
+            task.exception()
+
+    def _cancel(self, session_name: str):
+        timer = self._timers.pop(session_name, None)
+        if timer is not None:
+            timer.cancel()
+        self._deadlines.pop(session_name, None)
+        return self._dirty.pop(session_name, None)
+
+    async def flush(self, session_name: str):
+        async with self._lock(session_name):
+            data = self._cancel(session_name)
+            if data is None:
+                return
+            try:
+                await self._write(session_name, self._stored(data))
+            except Exception as e:
+                failures = self._failures[session_name] = self._failures.get(session_name, 0) + 1
+                if session_name in self._dirty:
+                    # Yangi o'zgarish allaqachon keyingi yozishni rejalashtirgan
+                    raise
+                if failures < self.max_retries:
+                    # Keyinroq qayta urinamiz
+                    self.mark_dirty(session_name, data, retry=True)
+                else:
+                    # Doimiy xato (disk to'la, ruxsat yo'q): cheksiz urinmaymiz, xabar beramiz.
+                    # Yangi tahrir yoki to'xtash paytidagi flush_all yana urinib ko'radi.
+                    self.failed[session_name] = data
+                    logger.error(f"{session_name} ma'lumotlari {failures} urinishdan keyin ham saqlanmadi: {e}")
+                    event_bus.publish("data.save_failed", session_name, error=str(e), attempts=failures)
+                raise
+            self._failures.pop(session_name, None)
+            self.failed.pop(session_name, None)
+
+    async def write(self, session_name: str, data: dict):
+        """Darhol yozadi (masalan, yangi sessiya fayli yaratilganda); kutilayotgan yozuv bekor qilinadi."""
+        async with self._lock(session_name):
+            self._cancel(session_name)
+            await self._write(session_name, self._stored(data))
+        session_data_cache[session_name] = data
+
+    @staticmethod
+    def _stored(data: dict) -> dict:
+        # Overlay sessiyalar uchun faqat bazadan farq yoziladi
+        return _snapshot(base_corpus.to_stored(data) if is_layered(data) else data)
+
+    async def _write(self, session_name: str, snapshot: dict):
+        path = get_session_data_path(session_name)
+        with tracer.span("json.save", session=session_name):
+            try:
+                await asyncio.to_thread(save_json, path, snapshot)
+            except Exception as e:
+                logger.error(f"{session_name} ma'lumotlarini saqlashda xato: {e}")
+                raise
+
+    def discard(self, session_name: str):
+        """Sessiya o'chirilganda kutilayotgan yozuvni bekor qiladi."""
+        self._cancel(session_name)
+        self._locks.pop(session_name, None)
+        self._failures.pop(session_name, None)
+        self.failed.pop(session_name, None)
+
+    async def flush_all(self):
+        for name, data in self.failed.items():
+            self._dirty.setdefault(name, data)
+        names = list(self._dirty)
+        results = await asyncio.gather(*[self.flush(name) for name in names], return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"{name} ma'lumotlarini yakuniy saqlashda xato: {result}")
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if names:
+            logger.info(f"Flushed {len(names)} pending session data file(s)")
+
+    def exists(self, session_name: str) -> bool:
+        return session_name in session_data_cache or os.path.exists(get_session_data_path(session_name))
+
+
+store = SessionStore()
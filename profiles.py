@@ -0,0 +1,162 @@
+# profiles.py
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, asdict
+from cachetools import TTLCache, LRUCache
+from config import (DIRS, PROFILE_REFRESH_INTERVAL, PROFILE_TTL, PROFILE_CACHE_SIZE,
+                    PROFILE_REFRESH_CONCURRENCY, PHOTO_CACHE_SIZE, get_logger)
+from utils import get_session_data_path
+from tracing import tracer
+
+logger = get_logger("profiles")
+
+
+@dataclass
+class SessionProfile:
+    session_name: str
+    first_name: str
+    last_name: str
+    username: str
+    id: int
+    profile_photo: str
+    photo_unique_id: str
+    status: str
+    data_file: str
+    refreshed_at: float
+
+    def to_dict(self, include_photos: bool = True) -> dict:
+        data = asdict(self)
+        del data["photo_unique_id"]
+        data["photo_url"] = f"/session_photo/{self.session_name}" if self.profile_photo else None
+        if not include_photos:
+            data["profile_photo"] = data["photo_url"] = None
+        return data
+
+
+# Sessiya nomi -> SessionProfile (TTL va hajm bo'yicha cheklangan)
+profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_TTL)
+# Sessiya nomi -> oxirgi yangilash xatosi
+profile_errors = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_TTL)
+# Sessiya nomi -> (etag, rasm baytlari)
+photo_cache = LRUCache(maxsize=PHOTO_CACHE_SIZE)
+
+_refresh_semaphore = None
+_inflight: dict = {}
+_refresher_task = None
+
+
+def get_photo_path(session_name: str) -> str:
+    return os.path.join(DIRS["photos"], f"{session_name}_profile.jpg")
+
+
+async def _download_photo(session_name: str, client, previous: SessionProfile = None):
+    """Profil rasmining eng kichik thumbnailini yuklaydi; rasm o'zgarmagan bo'lsa qayta yuklamaydi."""
+    photo_path = get_photo_path(session_name)
+    with tracer.span("telegram.get_chat_photos", session=session_name):
+        async for photo in client.get_chat_photos("me", limit=1):
+            unique_id = getattr(photo, "file_unique_id", None)
+            if previous and unique_id and previous.photo_unique_id == unique_id and os.path.exists(photo_path):
+                return photo_path, unique_id
+            thumbs = getattr(photo, "thumbs", None) or []
+            file_id = min(thumbs, key=lambda t: t.width).file_id if thumbs else photo.file_id
+            with tracer.span("telegram.download_media"):
+                path = await client.download_media(file_id, file_name=photo_path)
+            photo_cache.pop(session_name, None)
+            return path, unique_id
+    return None, None
+
+
+async def refresh_profile(session_name: str, client) -> SessionProfile:
+    global _refresh_semaphore
+    if _refresh_semaphore is None:
+        _refresh_semaphore = asyncio.Semaphore(PROFILE_REFRESH_CONCURRENCY)
+    async with _refresh_semaphore:
+        previous = profile_cache.get(session_name)
+        with tracer.span("telegram.get_me", session=session_name):
+            me = await client.get_me()
+        try:
+            profile_photo, unique_id = await _download_photo(session_name, client, previous)
+        except Exception as e:
+            logger.warning(f"Profil rasmini yuklab bo'lmadi ({session_name}): {e}")
+            profile_photo = previous.profile_photo if previous else None
+            unique_id = previous.photo_unique_id if previous else None
+        profile = SessionProfile(session_name=session_name, first_name=me.first_name, last_name=me.last_name or "",
+                                 username=me.username or "", id=me.id, profile_photo=profile_photo,
+                                 photo_unique_id=unique_id, status="active",
+                                 data_file=get_session_data_path(session_name), refreshed_at=time.time())
+        profile_cache[session_name] = profile
+        profile_errors.pop(session_name, None)
+        return profile
+
+
+def schedule_refresh(session_name: str, client):
+    """Profilni fonda yangilaydi; bir sessiya uchun bir vaqtda faqat bitta yangilash ishlaydi."""
+    task = _inflight.get(session_name)
+    if task is not None and not task.done():
+        return task
+
+    async def runner():
+        try:
+            await refresh_profile(session_name, client)
+        except Exception as e:
+            profile_errors[session_name] = str(e)
+            logger.error(f"Profilni yangilashda xato ({session_name}): {e}")
+        finally:
+            _inflight.pop(session_name, None)
+
+    task = asyncio.create_task(runner())
+    _inflight[session_name] = task
+    return task
+
+
+def forget_profile(session_name: str):
+    profile_cache.pop(session_name, None)
+    profile_errors.pop(session_name, None)
+    photo_cache.pop(session_name, None)
+
+
+async def _refresh_loop():
+    from client_manager import active_clients
+    while True:
+        tasks = [schedule_refresh(name, client) for name, client in list(active_clients.items())]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"{len(tasks)} ta sessiya profili yangilandi")
+        await asyncio.sleep(PROFILE_REFRESH_INTERVAL)
+
+
+def start_profile_refresher():
+    global _refresher_task
+    if _refresher_task is None or _refresher_task.done():
+        _refresher_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_profile_refresher():
+    global _refresher_task
+    tasks = [t for t in [_refresher_task, *_inflight.values()] if t is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _refresher_task = None
+
+
+def _read_photo(path: str):
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', content
+
+
+async def get_photo(session_name: str):
+    """(etag, baytlar) yoki rasm bo'lmasa None."""
+    cached = photo_cache.get(session_name)
+    if cached is not None:
+        return cached
+    path = get_photo_path(session_name)
+    if not os.path.exists(path):
+        return None
+    cached = await asyncio.to_thread(_read_photo, path)
+    photo_cache[session_name] = cached
+    return cached
@@ -1,20 +1,33 @@
-from fastapi import APIRouter, HTTPException, Request, UploadFile, File
-from fastapi.responses import FileResponse, Response
-from pyrogram import Client
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, Response, PlainTextResponse, StreamingResponse
 from pyrogram.errors import PhoneCodeInvalid, SessionPasswordNeeded, PhoneNumberInvalid
 from models import (LoginRequest, CodeRequest, PasswordRequest, QuestionRequest,
-                   ResponseRequest, EditQuestionRequest, SessionDataRequest)
-from utils import (load_json, save_json, get_session_data_path, modify_data, session_data_cache,
+                   ResponseRequest, EditQuestionRequest, SessionDataRequest, BroadcastEditRequest,
+                   MatchingConfigRequest)
+from utils import (get_session_data_path, modify_data, session_data_cache,
                   session_stats_cache, update_stats_cache, stop_client)
-from client_manager import active_clients, start_client, cache_storage
-from handlers import update_session_bot
-from config import DIRS, logger, DEFAULT_DATA_PATH
-import json
-import asyncio
+from client_manager import active_clients, start_client
+from handlers import update_session_bot, session_bots
+from tracing import tracer, traced, profiler
+from persistence import store
+from search import search_index
+from corpus import base_corpus, is_layered, BASE_NAME, BaseEditError
+from login_pool import login_manager, LoginCapacityError
+from lifecycle import lifecycle, HandoffError
+from scheduler import scheduler
+from unmatched import unmatched_log
+from config import DIRS, PROFILE_REFRESH_INTERVAL, EVENTS_HEARTBEAT, get_logger
+from logging_setup import payload
+from serialization import FastJSONResponse, dumps
+from events import event_bus
+from ai.matching import MatchConfig, match_stats
+from profiles import profile_cache, profile_errors, schedule_refresh, forget_profile, get_photo
 import os
 import zipfile
 from io import BytesIO
 
+logger = get_logger("routes")
+
 router = APIRouter()
 
 @router.get("/")
@@ -24,31 +37,19 @@ def read_root():
 
 @router.get("/get_sessions")
 async def get_sessions(include_photos: bool = True):
-    async def get_session_info(name: str, client):
-        cache_key = f"session_info:{name}"
-        if cache_key in cache_storage:
-            data = json.loads(cache_storage[cache_key])
-            if data.get("profile_photo") and not os.path.exists(data["profile_photo"]):
-                data["profile_photo"] = None
-            return data
-        try:
-            me = await client.get_me()
-            photo_path = os.path.join(DIRS["photos"], f"{name}_profile.jpg")
-            profile_photo = photo_path if os.path.exists(photo_path) else None
-            if include_photos and not profile_photo:
-                async for photo in client.get_chat_photos("me", limit=1):
-                    profile_photo = await client.download_media(photo.file_id, file_name=photo_path)
-                    break
-            data = {"session_name": name, "first_name": me.first_name, "last_name": me.last_name or "",
-                    "username": me.username or "", "id": me.id, "profile_photo": profile_photo, "status": "active",
-                    "data_file": get_session_data_path(name)}
-            cache_storage[cache_key] = json.dumps(data)
-            return data
-        except Exception as e:
-            return {"session_name": name, "error": str(e), "status": "error"}
-
-    sessions_info = await asyncio.gather(*[get_session_info(n, c) for n, c in active_clients.items()],
-                                         return_exceptions=True)
+    # Faqat xotiradagi keshdan javob beramiz; profillar fonda yangilanadi (profiles.py)
+    sessions_info = []
+    for name, client in active_clients.items():
+        profile = profile_cache.get(name)
+        if profile is not None:
+            sessions_info.append(profile.to_dict(include_photos))
+        elif name in profile_errors:
+            sessions_info.append({"session_name": name, "error": profile_errors[name], "status": "error"})
+        else:
+            schedule_refresh(name, client)
+            sessions_info.append({"session_name": name, "first_name": None, "last_name": "", "username": "",
+                                  "id": None, "profile_photo": None, "photo_url": None, "status": "active",
+                                  "data_file": get_session_data_path(name), "pending": True})
     inactive_sessions = {f.split(".")[0] for f in os.listdir(DIRS["sessions"]) if f.endswith(".session")} - set(
         active_clients.keys())
     sessions_info.extend({"session_name": name, "first_name": "Unknown", "last_name": "", "username": "", "id": None,
@@ -56,7 +57,28 @@ async def get_sessions(include_photos: bool = True):
                           "data_file": get_session_data_path(name) if os.path.exists(
                               get_session_data_path(name)) else None}
                          for name in inactive_sessions)
-    return {"sessions": sessions_info}
+    return FastJSONResponse({"sessions": sessions_info})
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match ro'yxatida ETag bormi (aniq taqqoslash; "*" va W/ prefiksi hisobga olinadi)."""
+    def strip(tag: str) -> str:
+        return tag[2:] if tag.startswith("W/") else tag
+
+    tags = [tag.strip() for tag in if_none_match.split(",") if tag.strip()]
+    return "*" in tags or strip(etag) in {strip(tag) for tag in tags}
+
+
+@router.get("/session_photo/{session_name}")
+async def session_photo(session_name: str, request: Request):
+    photo = await get_photo(session_name)
+    if photo is None:
+        raise HTTPException(status_code=404, detail="Profile photo not found")
+    etag, content = photo
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={PROFILE_REFRESH_INTERVAL}"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="image/jpeg", headers=headers)
 
 
 @router.post("/stop_session/{session_name}")
@@ -78,7 +100,9 @@ async def stop_clientd(session_name: str):
     try:
         await client.stop()  # disconnect() o'rniga stop() ishlatamiz
         del active_clients[session_name]
+        forget_profile(session_name)
         logger.info(f"{session_name} sessiyasi to'xtatildi. Active clients after stop: {list(active_clients.keys())}")
+        event_bus.publish("session.stopped", session_name, active=len(active_clients))
         return {"message": f"Sessiya {session_name} to'xtatildi"}
     except Exception as e:
         logger.error(f"Sessiyani to'xtatishda xato: {str(e)}")
@@ -95,16 +119,13 @@ async def start_session(session_name: str):
 
 @router.post("/start_login")
 async def start_login(request: LoginRequest, req: Request):
-    from client_manager import login_states, API_ID, API_HASH
-    session_name = f"temp_{request.phone_number.replace('+', '')}"
-    client = Client(session_name, api_id=API_ID, api_hash=API_HASH, workdir=DIRS["sessions"])
     try:
-        await client.connect()
-        sent_code = await client.send_code(request.phone_number)
-        login_states[request.phone_number] = {"phone_code_hash": sent_code.phone_code_hash,
-                                              "session_name": session_name, "client": client}
+        login = await login_manager.begin(request.phone_number, ip=req.client.host)
         logger.info(f"Login started for {request.phone_number} from IP: {req.client.host}")
-        return {"message": "Code sent", "phone_code_hash": sent_code.phone_code_hash, "session_name": session_name}
+        return {"message": "Code sent", "phone_code_hash": login.phone_code_hash, "session_name": login.session_name,
+                "expires_in": login_manager.ttl}
+    except LoginCapacityError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except PhoneNumberInvalid:
         raise HTTPException(status_code=400, detail="Invalid phone number")
     except Exception as e:
@@ -113,75 +134,130 @@ async def start_login(request: LoginRequest, req: Request):
 
 @router.post("/verify_code")
 async def verify_code(request: CodeRequest):
-    from client_manager import login_states
-    state = login_states.get(request.phone_number)
-    if not state:
+    login = login_manager.get(request.phone_number)
+    if not login:
         raise HTTPException(status_code=404, detail="Login session not found")
-    client = state["client"]
+    client = login.client
+    login.busy = True
     try:
         await client.sign_in(phone_number=request.phone_number, phone_code_hash=request.phone_code_hash,
                              phone_code=request.code)
         await client.storage.save()
-        del login_states[request.phone_number]
-        await start_client(state["session_name"])
-        return {"message": "Logged in", "session_name": state["session_name"]}
+        await login_manager.complete(request.phone_number)
+        await start_client(login.session_name)
+        return {"message": "Logged in", "session_name": login.session_name}
     except SessionPasswordNeeded:
-        login_states[request.phone_number]["requires_password"] = True
+        login_manager.require_password(request.phone_number)
         return {"message": "Password required", "phone_code_hash": request.phone_code_hash, "requires_password": True}
     except PhoneCodeInvalid:
         raise HTTPException(status_code=400, detail="Invalid code")
     except Exception as e:
         logger.error(f"Verify code error: {e}")
+        await login_manager.discard(request.phone_number, failed=True)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        if request.phone_number in login_states and not login_states[request.phone_number].get("requires_password"):
-            await client.disconnect()
+        login.busy = False
 
 @router.post("/verify_password")
 async def verify_password(request: PasswordRequest):
-    from client_manager import login_states
-    state = login_states.get(request.phone_number)
-    if not state:
+    login = login_manager.get(request.phone_number)
+    if not login:
         raise HTTPException(status_code=404, detail="Login session not found")
-    client = state["client"]
+    client = login.client
+    login.busy = True
     try:
         await client.check_password(request.password)
         await client.storage.save()
-        del login_states[request.phone_number]
-        await start_client(state["session_name"])
-        return {"message": "Logged in with 2FA", "session_name": state["session_name"]}
+        await login_manager.complete(request.phone_number)
+        await start_client(login.session_name)
+        return {"message": "Logged in with 2FA", "session_name": login.session_name}
     except Exception as e:
         logger.error(f"Verify password error: {e}")
         raise HTTPException(status_code=400, detail=f"Invalid password: {e}")
     finally:
-        if request.phone_number in login_states and not login_states[request.phone_number].get("requires_password"):
-            await client.disconnect()
+        login.busy = False
+
+@router.get("/admin/login_metrics")
+async def login_metrics():
+    return login_manager.metrics()
 
 @router.get("/get_pairs/{session_name}")
 async def get_pairs(session_name: str):
-    session_data_path = get_session_data_path(session_name)
-    if not os.path.exists(session_data_path):
+    data = await store.load(session_name)
+    if data is None:
         raise HTTPException(status_code=404, detail="Session data not found")
-    data = session_data_cache.get(session_name, load_json(session_data_path))
-    session_data_cache[session_name] = data
     update_stats_cache(session_name, data["data"]["pairs"])
-    return {"pairs": data["data"]["pairs"], "stats": session_stats_cache[session_name]}
+    # Katta korpus: jsonable_encoder ni chetlab o'tib, to'g'ridan-to'g'ri seriyalaymiz
+    return FastJSONResponse({"pairs": data["data"]["pairs"], "stats": session_stats_cache[session_name],
+                             "base": data.get("base")})
 
+@traced("modify_session_data")
 async def modify_session_data(session_name: str, operation: str, **kwargs):
     session_data_path = get_session_data_path(session_name)
-    if not os.path.exists(session_data_path):
+    data = await store.load(session_name)
+    if data is None:
         raise HTTPException(status_code=404, detail="Session data not found")
-    data = session_data_cache.get(session_name, load_json(session_data_path))
-    logger.info(f"Loaded data for {session_name}: {data}")
     result = modify_data(data, operation, **kwargs)
-    logger.info(f"Modified data for {session_name}: {data}")
-    save_json(session_data_path, data)
-    logger.info(f"Saved data to {session_data_path}")
-    session_data_cache[session_name] = data
+    logger.info("%s on %s: %s", operation, session_name, payload(kwargs))
+    logger.debug("Modified data for %s: %s", session_name, payload(data))
+    store.mark_dirty(session_name, data)
     update_stats_cache(session_name, data["data"]["pairs"])
+    event_bus.publish("data.edited", session_name, operation=operation, question=kwargs.get("question"),
+                      new_question=kwargs.get("new_question"))
+    search_index.update_questions(session_name, data["data"]["pairs"],
+                                  (kwargs.get("question"), kwargs.get("new_question")))
     await update_session_bot(session_name, session_data_path)
     return result
 
+@router.get("/base_pairs")
+async def get_base_pairs():
+    pairs = base_corpus.pairs
+    return FastJSONResponse({"pairs": pairs, "version": base_corpus.version,
+                             "stats": {"total_questions": len(pairs),
+                                       "total_responses": sum(len(p["responses"]) for p in pairs)}})
+
+@router.post("/broadcast_edit")
+async def broadcast_edit(request: BroadcastEditRequest):
+    """Umumiy korpusni bir marta tahrirlaydi; uni meros qilgan barcha sessiyalar yangilanadi."""
+    required = {"add_question": ("question", "responses"), "add_response": ("question", "response"),
+                "edit_question": ("question",), "edit_response": ("question", "response_index", "response"),
+                "delete_question": ("question",), "delete_response": ("question", "response_index")}
+    if request.operation not in required:
+        raise HTTPException(status_code=400, detail=f"Unknown operation: {request.operation}")
+    kwargs = request.model_dump(exclude_none=True, exclude={"operation"})
+    missing = [field for field in required[request.operation] if field not in kwargs]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing fields: {', '.join(missing)}")
+    if request.operation == "edit_question" and "new_question" not in kwargs:
+        kwargs["new_question"] = kwargs["question"]
+    if request.operation == "add_question" and not kwargs["responses"]:
+        raise HTTPException(status_code=400, detail="At least one response required")
+    try:
+        result, updated, overridden = await base_corpus.broadcast(request.operation, **kwargs)
+    except BaseEditError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if not (result[0] if isinstance(result, tuple) else result):
+        raise HTTPException(status_code=404, detail=f"Question '{request.question}' or response not found in base")
+    event_bus.publish("base.edited", operation=request.operation, question=request.question,
+                      version=base_corpus.version, updated_sessions=len(updated), overridden_sessions=overridden)
+    return {"message": f"Base corpus updated ({request.operation})", "version": base_corpus.version,
+            "updated_sessions": len(updated), "overridden_sessions": overridden}
+
+@router.post("/rebase_session/{session_name}")
+async def rebase_session(session_name: str):
+    """Eski (to'liq nusxa) sessiyani umumiy bazaga o'tkazadi; ma'lumot o'zgarmaydi, fayl faqat farqni saqlaydi."""
+    data = await store.load(session_name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Session data not found")
+    if is_layered(data):
+        return {"message": f"Session {session_name} already inherits the base corpus"}
+    data["base"] = BASE_NAME
+    store.mark_dirty(session_name, data)
+    await update_session_bot(session_name, get_session_data_path(session_name))
+    overlay = base_corpus.overlay_of(data)
+    return {"message": f"Session {session_name} now inherits the base corpus",
+            "upserts": len(overlay["upserts"]), "tombstones": len(overlay["tombstones"])}
+
 @router.post("/add_question/{session_name}")
 async def add_question(session_name: str, request: QuestionRequest):
     if not request.responses:
@@ -200,13 +276,16 @@ async def add_response(session_name: str, request: ResponseRequest, question: st
 @router.post("/add_session_data")
 async def add_session_data(request: SessionDataRequest):
     session_data_path = get_session_data_path(request.session_name)
-    data = session_data_cache.get(request.session_name, load_json(session_data_path))
+    data = await store.load(request.session_name)
+    if data is None:
+        data = {"data": {"pairs": []}}
+        session_data_cache[request.session_name] = data
     new_pairs = request.data.get("pairs", [])
     for pair in new_pairs:
         data["data"]["pairs"].append(pair)
-    save_json(session_data_path, data)
-    session_data_cache[request.session_name] = data
+    store.mark_dirty(request.session_name, data)
     update_stats_cache(request.session_name, data["data"]["pairs"])
+    search_index.add_pairs(request.session_name, new_pairs)
     await update_session_bot(request.session_name, session_data_path)
     return {"message": f"Session data added to {request.session_name}"}
 
@@ -245,10 +324,10 @@ async def import_session(file: UploadFile = File(...)):
         f.write(await file.read())
 
     if not os.path.exists(session_data_path):
-        default_data = load_json(DEFAULT_DATA_PATH, default={"data": {"pairs": []}})
-        save_json(session_data_path, default_data)
-        session_data_cache[session_name] = default_data
+        default_data = base_corpus.new_session_data()
+        await store.write(session_name, default_data)
         update_stats_cache(session_name, default_data["data"]["pairs"])
+        search_index.index_session(session_name, default_data["data"]["pairs"])
         logger.info(f"Session data created for {session_name} at {session_data_path}")
 
     try:
@@ -276,10 +355,10 @@ async def import_sessions(file: UploadFile = File(...)):
                     f.write(zip_file.read(file_name))
 
                 if not os.path.exists(session_data_path):
-                    default_data = load_json(DEFAULT_DATA_PATH, default={"data": {"pairs": []}})
-                    save_json(session_data_path, default_data)
-                    session_data_cache[session_name] = default_data
+                    default_data = base_corpus.new_session_data()
+                    await store.write(session_name, default_data)
                     update_stats_cache(session_name, default_data["data"]["pairs"])
+                    search_index.index_session(session_name, default_data["data"]["pairs"])
                     logger.info(f"Session data created for {session_name} at {session_data_path}")
 
                 try:
@@ -364,13 +443,12 @@ async def delete_response(session_name: str, question: str = None, response_inde
 @router.delete("/delete_session_data/{session_name}")
 async def delete_session_data(session_name: str):
     session_data_path = get_session_data_path(session_name)
-    if not os.path.exists(session_data_path):
+    if not store.exists(session_name):
         raise HTTPException(status_code=404, detail="Session data not found")
-    os.remove(session_data_path)
-    data = load_json(DEFAULT_DATA_PATH)
-    save_json(session_data_path, data)
-    session_data_cache[session_name] = data
+    data = base_corpus.new_session_data()
+    await store.write(session_name, data)
     update_stats_cache(session_name, data["data"]["pairs"])
+    search_index.index_session(session_name, data["data"]["pairs"])
     await update_session_bot(session_name, session_data_path)
     return {"message": f"Session data for {session_name} reset"}
 
@@ -390,6 +468,10 @@ async def delete_session(session_name: str):
             logger.error(f"Failed to stop client {session_name}: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to stop session: {str(e)}")
 
+    # Kutilayotgan yozuv o'chirilgan faylni qayta yaratmasligi uchun
+    store.discard(session_name)
+    search_index.remove_session(session_name)
+
     # 2. Fayllarni mavjudligini tekshirish va o‘chirish
     if not os.path.exists(session_file) and not os.path.exists(session_data_path):
         logger.warning(f"Session {session_name} not found (no session or data file)")
@@ -420,6 +502,7 @@ async def delete_session(session_name: str):
             )
 
     # 3. Keshni tozalash
+    forget_profile(session_name)
     if session_name in session_data_cache:
         del session_data_cache[session_name]
         logger.info(f"Session {session_name} removed from data cache")
@@ -427,11 +510,179 @@ async def delete_session(session_name: str):
         del session_stats_cache[session_name]
         logger.info(f"Session {session_name} removed from stats cache")
 
+    match_stats.forget(session_name)
+    scheduler.forget(session_name)
+    unmatched_log.forget(session_name)
     logger.info(f"Session {session_name} deleted successfully")
+    event_bus.publish("session.deleted", session_name)
     return {"message": f"Session {session_name} deleted"}
 
+@router.get("/matching/{session_name}")
+async def get_matching(session_name: str):
+    data = await store.load(session_name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Session data not found")
+    return {"session_name": session_name, "config": MatchConfig.from_dict(data.get("matching")).to_dict(),
+            "stats": match_stats.snapshot(session_name)}
+
+@router.put("/matching/{session_name}")
+async def set_matching(session_name: str, request: MatchingConfigRequest):
+    """Sessiya uchun moslashtirish chegaralarini o'zgartiradi (faqat berilgan maydonlar)."""
+    data = await store.load(session_name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Session data not found")
+    config = MatchConfig.from_dict({**(data.get("matching") or {}), **request.model_dump(exclude_none=True)})
+    try:
+        config.validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data["matching"] = config.to_dict()
+    store.mark_dirty(session_name, data)
+    if session_name in session_bots:
+        session_bots[session_name].config = config
+    event_bus.publish("data.edited", session_name, operation="matching", config=config.to_dict())
+    return {"session_name": session_name, "config": config.to_dict()}
+
+@router.get("/matching/{session_name}/explain")
+async def explain_match(session_name: str, q: str):
+    """Xabar qaysi savolga, qanday ishonch bilan va qaysi bosqichda moslashishini ko'rsatadi."""
+    if session_name not in session_bots:
+        data = await store.load(session_name)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Session data not found")
+        bot = base_corpus.build_bot(data, session_name)
+    else:
+        bot = session_bots[session_name]
+    return {"query": q, **bot.match(q).to_dict(), "config": bot.config.to_dict()}
+
+@router.get("/admin/matcher_stats")
+async def matcher_stats(session_name: str = None):
+    return match_stats.snapshot(session_name)
+
+@router.get("/unmatched/{session_name}")
+async def unmatched_top(session_name: str, limit: int = 20):
+    """Javob topilmagan eng ko'p uchragan iboralar (hisoblar count-min baholari)."""
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    return unmatched_log.top(session_name, limit)
+
+@router.get("/admin/unmatched")
+async def unmatched_metrics():
+    return unmatched_log.metrics()
+
+@router.get("/admin/scheduler")
+async def scheduler_metrics(session_name: str = None):
+    """Javob navbatlari: sessiya bo'yicha navbat uzunligi, tashlanganlar va kutish vaqtlari."""
+    return scheduler.metrics(session_name)
+
+@router.put("/admin/scheduler/{session_name}/weight")
+async def set_scheduler_weight(session_name: str, weight: int):
+    if weight < 1:
+        raise HTTPException(status_code=400, detail="weight must be at least 1")
+    scheduler.set_weight(session_name, weight)
+    return {"session_name": session_name, "weight": weight}
+
+@router.get("/search")
+async def search(q: str, k: int = 10, prefix: bool = False, session_name: str = None, field: str = "all"):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query parameter q is required")
+    if field not in ("all", "question", "response"):
+        raise HTTPException(status_code=400, detail="field must be one of: all, question, response")
+    return search_index.search(q, k=max(1, min(k, 100)), prefix=prefix, session_name=session_name, field=field)
+
 @router.get("/check_session/{session_name}")
 async def check_session(session_name: str):
     status = "active" if session_name in active_clients else "inactive"
     logger.info(f"{session_name} sessiyasi holati: {status}")
-    return {"session_name": session_name, "status": status}
\ No newline at end of file
+    return {"session_name": session_name, "status": status}
+
+@router.post("/admin/tracing")
+async def configure_tracing(enabled: bool = None, sample_rate: float = None):
+    tracer.configure(enabled=enabled, sample_rate=sample_rate)
+    return {"enabled": tracer.enabled, "sample_rate": tracer.sample_rate, "file": tracer.path}
+
+@router.post("/admin/profile")
+async def run_profiler(seconds: float = 10, interval_ms: float = 5):
+    if not 0 < seconds <= 120:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 120]")
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    try:
+        stacks = await profiler.profile(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
+
+@router.get("/healthz")
+async def healthz():
+    # Liveness: event loop javob beryapti
+    return lifecycle.status()
+
+@router.get("/readyz")
+async def readyz():
+    # Readiness: yangi so'rovlarni qabul qilamiz (drain/handoff paytida 503)
+    if not lifecycle.ready:
+        raise HTTPException(status_code=503, detail=lifecycle.status())
+    return {**lifecycle.status(), "active_sessions": len(active_clients)}
+
+@router.post("/admin/drain")
+async def drain(timeout: float = None):
+    return {**await lifecycle.drain(timeout), **lifecycle.status()}
+
+@router.post("/admin/handoff/release/{session_name}")
+async def handoff_release(session_name: str, timeout: float = None):
+    try:
+        pending = await lifecycle.release(session_name, timeout)
+    except HandoffError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"released": session_name, "pending": pending}
+
+def _event_filters(types: str = None) -> set:
+    return {t.strip() for t in types.split(",") if t.strip()} if types else None
+
+@router.get("/events")
+async def events(request: Request, types: str = None, session_name: str = None):
+    """Server-Sent Events: sessiya holati, xabar/javob faoliyati va ma'lumot tahrirlari.
+
+    `types` - vergul bilan ajratilgan turlar yoki guruhlar (session, message, reply, data, base, server).
+    Qayta ulanishda brauzer yuboradigan Last-Event-ID dan keyingi hodisalar qayta yuboriladi.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    subscriber = event_bus.subscribe(_event_filters(types), session_name,
+                                     int(last_event_id) if last_event_id and last_event_id.isdigit() else None)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.closed:
+                batch = await subscriber.get(EVENTS_HEARTBEAT)
+                if await request.is_disconnected():
+                    break
+                if not batch:
+                    yield ": ping\n\n"
+                    continue
+                yield "".join(f"id: {event['id']}\nevent: {event['type']}\ndata: {dumps(event).decode()}\n\n"
+                              for event in batch)
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/ws/events")
+async def ws_events(websocket: WebSocket, types: str = None, session_name: str = None):
+    await websocket.accept()
+    subscriber = event_bus.subscribe(_event_filters(types), session_name)
+    try:
+        while not subscriber.closed:
+            batch = await subscriber.get(EVENTS_HEARTBEAT)
+            for event in batch or [{"type": "ping"}]:
+                await websocket.send_text(dumps(event).decode())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+@router.get("/admin/event_metrics")
+async def event_metrics():
+    return event_bus.metrics()
@@ -0,0 +1,247 @@
+# scheduler.py
+#
+# Xabarlarni qayta ishlashning adolatli rejalashtiruvchisi.
+#
+# auto_reply handleri xabarni darhol sessiya navbatiga qo'yadi; moslashtirish ishi (get_me,
+# matcher) ishchida bajariladi va javobni "odamga o'xshash" kechikishdan keyin yuborish uchun
+# yana navbatga qo'yadi (`not_before`). Umumiy SCHEDULER_WORKERS ta ishchi tayyor
+# bo'lgan ishlarni sessiyalar orasida weighted deficit round-robin bo'yicha taqsimlaydi:
+#   - bitta sessiya bir vaqtda SESSION_CONCURRENCY tadan ko'p ish bajara olmaydi;
+#   - sessiya navbati SESSION_QUEUE_LIMIT dan oshsa, eng eski ish tashlanadi (shedding) - spam
+#     to'lqinida ortiqcha xabarlar moslashtirishga yetib bormaydi;
+#   - og'irligi (SESSION_WEIGHTS, masalan "vip=3") katta sessiya har aylanishda ko'proq ish oladi.
+# Shunday qilib spam oqimi kelgan akkaunt boshqa akkauntlarning javoblarini kechiktirmaydi.
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from config import SCHEDULER_WORKERS, SESSION_CONCURRENCY, SESSION_QUEUE_LIMIT, SESSION_WEIGHTS, get_logger
+
+logger = get_logger("scheduler")
+
+
+def parse_weights(spec: str) -> dict:
+    """"vip=3,other=1" -> {"vip": 3, "other": 1}"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = max(1, int(weight))
+    return weights
+
+
+class Job:
+    __slots__ = ("session_name", "fn", "not_before", "submitted_at", "seq", "future", "on_shed")
+
+    def __init__(self, session_name: str, fn, not_before: float, seq: int, on_shed=None):
+        self.session_name = session_name
+        self.fn = fn
+        self.not_before = not_before
+        self.submitted_at = time.monotonic()
+        self.seq = seq
+        self.future = asyncio.get_running_loop().create_future()
+        self.on_shed = on_shed
+
+    def __lt__(self, other: "Job") -> bool:
+        return (self.not_before, self.seq) < (other.not_before, other.seq)
+
+
+class SessionQueue:
+    def __init__(self, name: str, weight: int):
+        self.name = name
+        self.weight = weight
+        self.jobs: list = []  # not_before bo'yicha heap
+        self.running = 0
+        self.deficit = 0
+        self.in_ring = False
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "shed": 0}
+        self.waits = deque(maxlen=1000)
+        self.max_wait = 0.0
+
+    def ready(self, now: float) -> bool:
+        return bool(self.jobs) and self.jobs[0].not_before <= now
+
+    def metrics(self) -> dict:
+        waits = sorted(self.waits)
+
+        def pct(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))], 4) if waits else 0.0
+
+        return {"weight": self.weight, "queued": len(self.jobs), "running": self.running, **self.counters,
+                "wait_p50": pct(0.5), "wait_p95": pct(0.95), "wait_max": round(self.max_wait, 4)}
+
+
+class ReplyScheduler:
+    def __init__(self, workers: int = SCHEDULER_WORKERS, concurrency: int = SESSION_CONCURRENCY,
+                 queue_limit: int = SESSION_QUEUE_LIMIT, weights: dict = None):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.weights = dict(weights or {})
+        self._queues: dict = {}
+        self._ring = deque()
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._tasks: list = []
+
+    def _queue(self, session_name: str) -> SessionQueue:
+        queue = self._queues.get(session_name)
+        if queue is None:
+            queue = self._queues[session_name] = SessionQueue(session_name, self.weights.get(session_name, 1))
+        return queue
+
+    def set_weight(self, session_name: str, weight: int):
+        self.weights[session_name] = weight
+        self._queue(session_name).weight = weight
+
+    # --- Navbatga qo'yish ---
+
+    def submit(self, session_name: str, fn, delay: float = 0.0, on_shed=None) -> asyncio.Future:
+        """`fn()` korutinasini `delay` soniyadan keyin bajarish uchun navbatga qo'yadi.
+
+        Qaytgan future ish tugaganda (yoki tashlanganda - bekor qilinadi) yakunlanadi.
+        `on_shed(job)` ish navbat to'lgani sababli tashlanganda chaqiriladi.
+        """
+        queue = self._queue(session_name)
+        if len(queue.jobs) >= self.queue_limit:
+            self._shed_oldest(queue)
+        job = Job(session_name, fn, time.monotonic() + delay, next(self._seq), on_shed)
+        heapq.heappush(queue.jobs, job)
+        queue.counters["submitted"] += 1
+        if not queue.in_ring:
+            queue.in_ring = True
+            self._ring.append(queue)
+        self._notify()
+        return job.future
+
+    def _shed_oldest(self, queue: SessionQueue):
+        oldest = min(range(len(queue.jobs)), key=lambda i: queue.jobs[i].seq)
+        job = queue.jobs[oldest]
+        queue.jobs[oldest] = queue.jobs[-1]
+        queue.jobs.pop()
+        heapq.heapify(queue.jobs)
+        queue.counters["shed"] += 1
+        job.future.cancel()
+        if job.on_shed is not None:
+            job.on_shed(job)
+
+    def expedite(self, session_name: str = None):
+        """Kutayotgan ishlarni kechikishsiz bajarishga ruxsat beradi (drain/handoff)."""
+        queues = [self._queues[session_name]] if session_name in self._queues else (
+            [] if session_name is not None else list(self._queues.values()))
+        for queue in queues:
+            for job in queue.jobs:
+                job.not_before = 0.0
+            heapq.heapify(queue.jobs)
+        self._notify()
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- Tanlash (deficit round-robin) ---
+
+    def _pick(self):
+        """(ish, None) yoki (None, keyingi ish tayyor bo'lguncha soniyalar | None)."""
+        now = time.monotonic()
+        skipped = 0
+        while self._ring and skipped < len(self._ring):
+            queue = self._ring[0]
+            if not queue.jobs:
+                self._ring.popleft()
+                queue.in_ring = False
+                queue.deficit = 0
+                continue
+            if queue.running >= self.concurrency or not queue.ready(now):
+                self._ring.rotate(-1)
+                skipped += 1
+                continue
+            if queue.deficit < 1:
+                queue.deficit += queue.weight
+            queue.deficit -= 1
+            job = heapq.heappop(queue.jobs)
+            # Kvota tugasa, navbat keyingi sessiyaga o'tadi
+            if queue.deficit < 1 or not queue.ready(now):
+                self._ring.rotate(-1)
+            return job, None
+        pending = [queue.jobs[0].not_before for queue in self._ring
+                   if queue.jobs and queue.running < self.concurrency]
+        return None, (max(0.0, min(pending) - now) if pending else None)
+
+    async def _worker(self):
+        while True:
+            job, timeout = self._pick()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        queue = self._queue(job.session_name)
+        queue.running += 1
+        wait = max(0.0, time.monotonic() - max(job.not_before, job.submitted_at))
+        queue.waits.append(wait)
+        queue.max_wait = max(queue.max_wait, wait)
+        try:
+            result = await job.fn()
+            queue.counters["completed"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            queue.counters["failed"] += 1
+            logger.error("Scheduled job for %s failed: %s", job.session_name, e)
+            if not job.future.done():
+                job.future.set_result(None)
+        finally:
+            queue.running -= 1
+            self._notify()
+
+    # --- Ishga tushirish / to'xtatish ---
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def pending(self) -> int:
+        return sum(len(queue.jobs) + queue.running for queue in self._queues.values())
+
+    async def shutdown(self, timeout: float = 0.0):
+        """Navbatdagi ishlarni `timeout` ichida bajarib bo'lishga urinadi, so'ng ishchilarni to'xtatadi."""
+        if timeout and self.pending():
+            self.expedite()
+            deadline = time.monotonic() + timeout
+            while self.pending() and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._queues.values():
+            while queue.jobs:
+                self._shed_oldest(queue)
+
+    def forget(self, session_name: str):
+        queue = self._queues.get(session_name)
+        if queue is not None and not queue.jobs and not queue.running:
+            del self._queues[session_name]
+            if queue.in_ring:
+                self._ring.remove(queue)
+
+    def metrics(self, session_name: str = None) -> dict:
+        if session_name is not None:
+            queue = self._queues.get(session_name)
+            return queue.metrics() if queue is not None else {}
+        return {"workers": self.workers, "concurrency": self.concurrency, "queue_limit": self.queue_limit,
+                "queued": sum(len(queue.jobs) for queue in self._queues.values()),
+                "running": sum(queue.running for queue in self._queues.values()),
+                "sessions": {name: queue.metrics() for name, queue in self._queues.items()}}
+
+
+scheduler = ReplyScheduler(weights=parse_weights(SESSION_WEIGHTS))
@@ -0,0 +1,178 @@
+# search.py
+
+import asyncio
+import bisect
+import heapq
+import math
+import os
+import re
+import time
+from collections import Counter
+from config import DIRS, get_logger
+
+logger = get_logger("search")
+
+# O'zbek tilidagi tutuq belgilarining turli ko'rinishlari (o‘, g', oʻ ...)
+_APOSTROPHES = str.maketrans({"‘": "'", "’": "'", "ʻ": "'", "ʼ": "'", "`": "'"})
+_TOKEN_RE = re.compile(r"[\w']+")
+
+QUESTION = 1
+RESPONSE = 2
+# Savoldagi moslik javobdagidan qimmatroq
+FIELD_WEIGHTS = {QUESTION: 2.0, RESPONSE: 1.0, QUESTION | RESPONSE: 2.5}
+
+
+def tokenize(text: str) -> list:
+    tokens = (t.strip("'") for t in _TOKEN_RE.findall(text.lower().translate(_APOSTROPHES)))
+    return [t for t in tokens if t]
+
+
+class SearchIndex:
+    """Barcha sessiyalarning savol va javoblari bo'yicha xotiradagi inverted index.
+
+    Hujjat - (sessiya, savol) juftligi. Postinglar token -> {hujjat: maydonlar bitmaskasi}.
+    """
+
+    def __init__(self):
+        self._postings: dict = {}
+        self._docs: dict = {}
+        self._session_docs: dict = {}
+        self._sorted_tokens: list = []
+        self._tokens_dirty = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    @property
+    def sessions(self) -> list:
+        return list(self._session_docs)
+
+    def _add(self, session_name: str, pair: dict):
+        key = (session_name, pair["question"])
+        fields = Counter()
+        for token in tokenize(pair["question"]):
+            fields[token] |= QUESTION
+        for response in pair.get("responses", []):
+            for token in tokenize(str(response)):
+                fields[token] |= RESPONSE
+        for token, mask in fields.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._tokens_dirty = True
+            postings[key] = mask
+        self._docs[key] = (pair, tuple(fields))
+        self._session_docs.setdefault(session_name, set()).add(pair["question"])
+
+    def _remove(self, session_name: str, question: str):
+        key = (session_name, question)
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return
+        for token in entry[1]:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                self._tokens_dirty = True
+        questions = self._session_docs.get(session_name)
+        if questions is not None:
+            questions.discard(question)
+            if not questions:
+                del self._session_docs[session_name]
+
+    def index_session(self, session_name: str, pairs: list):
+        self.remove_session(session_name)
+        for pair in pairs:
+            self._add(session_name, pair)
+
+    def remove_session(self, session_name: str):
+        for question in list(self._session_docs.get(session_name, ())):
+            self._remove(session_name, question)
+
+    def update_questions(self, session_name: str, pairs: list, questions):
+        """Berilgan savollarni qayta indekslaydi (`modify_data` dan keyin chaqiriladi)."""
+        questions = {q for q in questions if q is not None}
+        for question in questions:
+            self._remove(session_name, question)
+        for pair in pairs:
+            if pair["question"] in questions:
+                self._add(session_name, pair)
+
+    def add_pairs(self, session_name: str, pairs: list):
+        for pair in pairs:
+            self._remove(session_name, pair["question"])
+            self._add(session_name, pair)
+
+    def apply_diff(self, session_name: str, diff: dict):
+        for pair in diff["removed"]:
+            self._remove(session_name, pair["question"])
+        self.add_pairs(session_name, diff["added"] + [new for _, new in diff["changed"]])
+
+    def _expand(self, token: str, prefix: bool) -> list:
+        if not prefix:
+            return [token] if token in self._postings else []
+        if self._tokens_dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._tokens_dirty = False
+        start = bisect.bisect_left(self._sorted_tokens, token)
+        end = bisect.bisect_left(self._sorted_tokens, token + "\uffff")
+        return self._sorted_tokens[start:end]
+
+    def search(self, query: str, k: int = 10, prefix: bool = False, session_name: str = None,
+               field: str = "all") -> dict:
+        started = time.perf_counter()
+        field_mask = {"question": QUESTION, "response": RESPONSE}.get(field, QUESTION | RESPONSE)
+        total_docs = max(len(self._docs), 1)
+        scores = None
+        for token in dict.fromkeys(tokenize(query)):
+            token_scores = {}
+            for term in self._expand(token, prefix):
+                postings = self._postings[term]
+                idf = math.log(1 + total_docs / len(postings))
+                for key, mask in postings.items():
+                    if not mask & field_mask or (session_name and key[0] != session_name):
+                        continue
+                    score = idf * FIELD_WEIGHTS[mask & field_mask]
+                    if score > token_scores.get(key, 0.0):
+                        token_scores[key] = score
+            # Barcha tokenlar mos kelishi kerak (AND)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {key: scores[key] + s for key, s in token_scores.items() if key in scores}
+            if not scores:
+                break
+        scores = scores or {}
+
+        facets = Counter(key[0] for key in scores)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        results = [{"session_name": key[0], "question": key[1], "responses": self._docs[key][0]["responses"],
+                    "score": round(score, 4)} for key, score in top]
+        return {"query": query, "total": len(scores), "results": results, "facets": dict(facets.most_common()),
+                "took_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+search_index = SearchIndex()
+
+
+async def build_search_index():
+    """Ishga tushishda DATA_DIR dagi barcha sessiyalarni indekslaydi."""
+    from persistence import store
+    started = time.perf_counter()
+    suffix = "_data.json"
+    names = [f[:-len(suffix)] for f in os.listdir(DIRS["data"]) if f.endswith(suffix)]
+    for name in names:
+        try:
+            data = await store.load(name)
+        except Exception as e:
+            logger.error(f"{name} ni indekslashda xato: {e}")
+            continue
+        if data is not None:
+            search_index.index_session(name, data["data"]["pairs"])
+        # Katta korpuslarda event loopni bo'shatib turamiz
+        await asyncio.sleep(0)
+    logger.info(f"Search index built: {len(names)} sessions, {len(search_index)} documents in "
+                f"{time.perf_counter() - started:.2f}s")
@@ -0,0 +1,52 @@
+# serialization.py
+#
+# JSON seriyalash: orjson o'rnatilgan bo'lsa undan, aks holda stdlib json dan foydalaniladi.
+# JSON_BACKEND=json bilan orjson mavjud bo'lsa ham stdlib majburan tanlanadi.
+
+import json
+from fastapi.responses import JSONResponse
+from config import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - ixtiyoriy bog'liqlik
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None and JSON_BACKEND != "json" else "json"
+
+
+def _default(obj):
+    # set, Path, datetime va h.k. - matn ko'rinishida
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+if BACKEND == "orjson":
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+    _PRETTY = _OPTIONS | orjson.OPT_INDENT_2
+
+    def dumps(obj, pretty: bool = False) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_PRETTY if pretty else _OPTIONS)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(obj, pretty: bool = False) -> bytes:
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2, default=_default).encode("utf-8")
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Standart javob klassi: `dumps` orqali seriyalaydi.
+
+    Katta javoblarni marshrutdan to'g'ridan-to'g'ri `FastJSONResponse(content)` sifatida
+    qaytarish FastAPI ning `jsonable_encoder` dan o'tishini ham chetlab o'tadi.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
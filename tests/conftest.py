@@ -0,0 +1,17 @@
+# tests/conftest.py
+#
+# Modullar import qilinishidan oldin barcha kataloglarni vaqtinchalik joyga yo'naltiradi:
+# testlar repodagi sessions/, session_data/ va data.json ga tegmaydi.
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="torex-tests-")
+for name, sub in (("SESSIONS_DIR", "sessions"), ("DATA_DIR", "session_data"), ("PHOTOS_DIR", "profile_photos"),
+                  ("UNMATCHED_DIR", "unmatched")):
+    os.environ[name] = os.path.join(_tmp, sub)
+os.environ["TRACE_FILE"] = os.path.join(_tmp, "traces.jsonl")
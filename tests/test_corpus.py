@@ -0,0 +1,41 @@
+# tests/test_corpus.py
+
+import asyncio
+import os
+import pytest
+from config import DIRS
+from corpus import BaseCorpus
+from utils import load_json, save_json, session_data_cache
+
+
+@pytest.fixture
+def corpus():
+    path = os.path.join(DIRS["data"], "base.json")
+    save_json(path, {"data": {"pairs": [{"question": "salom", "responses": ["Assalomu alaykum"]},
+                                        {"question": "narxi qancha", "responses": ["100 ming"]}]}})
+    base = BaseCorpus(path)
+    base.ensure_loaded()
+    session_data_cache["inherits"] = base.new_session_data()
+    yield base
+    session_data_cache.pop("inherits", None)
+    os.remove(path)
+
+
+def test_delete_question_broadcast_propagates(corpus):
+    result, updated, overridden = asyncio.run(corpus.broadcast("delete_question", question="salom"))
+
+    assert result
+    assert updated == ["inherits"] and overridden == []
+    assert "salom" not in corpus.by_question
+    assert [pair["question"] for pair in load_json(corpus.path)["data"]["pairs"]] == ["narxi qancha"]
+    assert [pair["question"] for pair in session_data_cache["inherits"]["data"]["pairs"]] == ["narxi qancha"]
+    assert corpus.bot.match("salom").question != "salom"
+
+
+def test_failed_broadcast_leaves_base_untouched(corpus):
+    version = corpus.version
+    result, updated, _ = asyncio.run(corpus.broadcast("delete_question", question="yo'q"))
+
+    assert not result and updated == []
+    assert corpus.version == version
+    assert [pair["question"] for pair in corpus.pairs] == ["salom", "narxi qancha"]
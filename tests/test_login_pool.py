@@ -0,0 +1,87 @@
+# tests/test_login_pool.py
+
+import asyncio
+import os
+import pytest
+import login_pool
+from config import DIRS
+
+
+class LoginClient:
+    """connect() da sqlite fayl yaratadigan soxta mijoz; send_code `error` ni ko'taradi."""
+
+    error = None
+
+    def __init__(self, name, api_id=None, api_hash=None, workdir=None, **kwargs):
+        self.path = os.path.join(workdir, f"{name}.session")
+        self.is_connected = False
+        self.storage = self
+
+    async def connect(self):
+        with open(self.path, "w") as f:
+            f.write("new")
+        self.is_connected = True
+
+    async def send_code(self, phone_number):
+        if self.error is not None:
+            raise self.error
+        return type("SentCode", (), {"phone_code_hash": "hash"})()
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def live_session(monkeypatch):
+    monkeypatch.setattr(login_pool, "Client", LoginClient)
+    monkeypatch.setattr(LoginClient, "error", None)
+    path = os.path.join(DIRS["sessions"], "temp_998901234567.session")
+    with open(path, "w") as f:
+        f.write("live")
+    yield path
+    os.remove(path)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_failed_begin_keeps_existing_session(live_session):
+    LoginClient.error = RuntimeError("FLOOD_WAIT")
+    manager = login_pool.LoginManager()
+    with pytest.raises(RuntimeError):
+        asyncio.run(manager.begin("+998901234567"))
+    assert read(live_session) == "live"
+    assert os.listdir(login_pool.PENDING_DIR) == []
+
+
+def test_expired_and_discarded_logins_keep_existing_session(live_session):
+    async def scenario():
+        manager = login_pool.LoginManager(ttl=0)
+        await manager.begin("+998901234567")
+        await manager.sweep()
+        await manager.begin("+998901234567")
+        await manager.discard("+998901234567")
+        return manager
+
+    manager = asyncio.run(scenario())
+    assert manager.counters["expired"] == 1
+    assert read(live_session) == "live"
+    assert os.listdir(login_pool.PENDING_DIR) == []
+
+
+def test_complete_replaces_session(live_session):
+    async def scenario():
+        manager = login_pool.LoginManager()
+        login = await manager.begin("+998901234567")
+        await manager.complete("+998901234567")
+        return login
+
+    login = asyncio.run(scenario())
+    assert login.session_name == "temp_998901234567"
+    assert read(live_session) == "new"
+    assert os.listdir(login_pool.PENDING_DIR) == []
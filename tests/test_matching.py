@@ -0,0 +1,14 @@
+# tests/test_matching.py
+
+from ai.response import CustomChatBot
+
+
+def test_punctuation_only_question_is_not_an_exact_catch_all():
+    bot = CustomChatBot(data={"data": {"pairs": [{"question": "👍", "responses": ["Rahmat"]},
+                                                 {"question": "salom", "responses": ["Va alaykum"]}]}})
+    bot.apply_diff({"added": [{"question": "???", "responses": ["Savol?"]}], "removed": [], "changed": []})
+
+    assert "" not in bot.exact
+    for text in ("😂", "...", "!!"):
+        assert bot.match(text).stage != "exact"
+    assert bot.match("Salom!").question == "salom"
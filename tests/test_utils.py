@@ -0,0 +1,23 @@
+# tests/test_utils.py
+
+from utils import diff_pairs
+
+
+def pairs(*items):
+    return [{"question": question, "responses": list(responses)} for question, responses in items]
+
+
+def test_untouched_duplicates_do_not_force_rebuild():
+    old = pairs(("shu", ["a"]), ("shu", ["b"]), ("salom", ["c"]))
+    new = pairs(("shu", ["a"]), ("shu", ["b"]), ("salom", ["c", "d"]))
+
+    diff = diff_pairs(old, new)
+    assert not diff["rebuild"]
+    assert [new_pair["question"] for _, new_pair in diff["changed"]] == ["salom"]
+
+
+def test_edits_to_colliding_questions_rebuild():
+    old = pairs(("shu", ["a"]), ("shu", ["b"]), ("salom", ["c"]))
+    assert diff_pairs(old, pairs(("shu", ["a"]), ("salom", ["c"])))["rebuild"]
+    assert diff_pairs(old, old + pairs(("SHU", ["e"])))["rebuild"]
+    assert diff_pairs(pairs(("salom", ["c"])), pairs(("salom", ["c"]), ("Salom", ["e"])))["rebuild"]
@@ -0,0 +1,214 @@
+# tracing.py
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from config import TRACE_ENABLED, TRACE_SAMPLE_RATE, TRACE_FILE, get_logger
+
+logger = get_logger("tracing")
+
+# Joriy span (har bir so'rov/task uchun alohida)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Namuna olinmagan trace uchun belgi: ichki spanlar ham yozilmaydi
+_UNSAMPLED = object()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "duration")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attrs: dict = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "name": self.name, "start": self.start, "duration_ms": round(self.duration * 1000, 3),
+                "attrs": self.attrs}
+
+
+class Tracer:
+    """Spanlarni yig'ib, JSONL faylga partiyalab yozadi.
+
+    To'lgan partiya fon threadiga navbat orqali uzatiladi: spanni yopgan so'rov yoki
+    auto_reply korutinasi event loopda fayl I/O qilmaydi (logging_setup dagi kabi).
+    """
+
+    def __init__(self, path: str, sample_rate: float, enabled: bool, batch_size: int = 64):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def configure(self, enabled: bool = None, sample_rate: float = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if not self.enabled:
+            self.flush(wait=False)
+
+    @contextmanager
+    def span(self, name: str, force: bool = False, **attrs):
+        parent = _current_span.get()
+        if parent is _UNSAMPLED or (parent is None and not self._should_sample(force)):
+            # Trace namunaga tushmadi: ichki spanlar ham arzon bo'lishi uchun belgini o'rnatamiz
+            token = _current_span.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                _current_span.reset(token)
+            return
+
+        if parent is None:
+            span = Span(name, uuid.uuid4().hex, attrs=attrs)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attrs)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._record(span)
+
+    def _should_sample(self, force: bool) -> bool:
+        if not self.enabled:
+            return False
+        return force or random.random() < self.sample_rate
+
+    def _record(self, span: Span):
+        with self._lock:
+            self._buffer.append(span.to_dict())
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._submit(batch)
+
+    def _submit(self, batch: list):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="trace-writer", daemon=True)
+                    self._writer.start()
+        self._queue.put(batch)
+
+    def _run_writer(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                self._write(batch)
+            finally:
+                self._queue.task_done()
+
+    def flush(self, wait: bool = True):
+        """Buferdagi spanlarni yozuvchiga uzatadi; `wait` bo'lsa yozilib bo'lishini kutadi (to'xtashda)."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._submit(batch)
+        if wait and self._writer is not None:
+            self._queue.join()
+
+    def _write(self, batch: list):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in batch))
+        except OSError as e:
+            logger.error(f"Trace faylga yozishda xato: {e}")
+
+
+tracer = Tracer(TRACE_FILE, TRACE_SAMPLE_RATE, TRACE_ENABLED)
+# Yozuvchi daemon thread: jarayon tugashidan oldin navbatdagi partiyalar yozib bo'linadi
+atexit.register(tracer.flush)
+
+
+def traced(name: str = None):
+    """Funksiyani (sync yoki async) span bilan o'raydi."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Barcha threadlarning steklarini davriy o'qib, collapsed-stack formatida qaytaradi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, seconds: float, interval: float = 0.005) -> str:
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Profiler already running")
+        try:
+            own_id = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+                time.sleep(interval)
+            return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+    async def profile(self, seconds: float, interval: float = 0.005) -> str:
+        return await asyncio.to_thread(self.run, seconds, interval)
+
+
+profiler = SamplingProfiler()
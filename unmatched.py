@@ -0,0 +1,232 @@
+# unmatched.py
+#
+# Javob topilmagan xabarlar jurnali - korpusni to'ldirish uchun.
+#
+# auto_reply xatoda `unmatched_log.record(...)` ni chaqiradi: bu sinxron va arzon - yozuv
+# xotiradagi buferga qo'shiladi va sessiyaning xulosasi (count-min sketch + eng ko'p
+# uchraganlar ro'yxati) yangilanadi. Fon vazifasi buferni har UNMATCHED_FLUSH_INTERVAL
+# soniyada (yoki UNMATCHED_BATCH ta yozuv yig'ilsa) UNMATCHED_DIR dagi segment fayllarga
+# qo'shadi. Segment UNMATCHED_SEGMENT_BYTES dan oshsa yangisi ochiladi, UNMATCHED_SEGMENTS
+# tadan eskilari o'chiriladi. Katalog DATA_DIR dan tashqarida - kuzatuvchi reload qilmaydi.
+#
+# GET /unmatched/{session} xom loglarni o'qimasdan xulosadan javob beradi; ishga tushganda
+# xulosa saqlangan segmentlardan bir marta qayta tiklanadi.
+
+import asyncio
+import hashlib
+import os
+import time
+from config import (UNMATCHED_DIR, UNMATCHED_FLUSH_INTERVAL, UNMATCHED_BATCH, UNMATCHED_BUFFER,
+                    UNMATCHED_SEGMENT_BYTES, UNMATCHED_SEGMENTS, UNMATCHED_TOP_K, UNMATCHED_SKETCH_WIDTH,
+                    UNMATCHED_SKETCH_DEPTH, get_logger)
+from serialization import dumps, loads
+from ai.matching import normalize
+
+logger = get_logger("unmatched")
+
+MAX_TEXT = 200
+
+
+class CountMinSketch:
+    """Qat'iy xotirali chastota bahosi (hech qachon kam baholamaydi)."""
+
+    def __init__(self, width: int = UNMATCHED_SKETCH_WIDTH, depth: int = UNMATCHED_SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> list:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[i * 4:i * 4 + 4], "little") % self.width for i in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Hisobni oshiradi va yangi bahoni qaytaradi."""
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += 1
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+        return estimate
+
+
+class HeavyHitters:
+    """Sessiya xulosasi: sketch bahosi bo'yicha eng ko'p uchragan `capacity` ta ibora."""
+
+    def __init__(self, capacity: int = UNMATCHED_TOP_K * 2):
+        self.capacity = capacity
+        self.sketch = CountMinSketch()
+        self.top: dict = {}  # ibora -> [baho, eng yaxshi score, oxirgi vaqt]
+        self.total = 0
+
+    def add(self, text: str, score: float, ts: float):
+        self.total += 1
+        estimate = self.sketch.add(text)
+        entry = self.top.get(text)
+        if entry is not None:
+            entry[0] = estimate
+            entry[1] = max(entry[1], score)
+            entry[2] = ts
+            return
+        if len(self.top) >= self.capacity:
+            weakest = min(self.top, key=lambda key: self.top[key][0])
+            if self.top[weakest][0] >= estimate:
+                return
+            del self.top[weakest]
+        self.top[text] = [estimate, score, ts]
+
+    def most_common(self, limit: int) -> list:
+        ranked = sorted(self.top.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [{"text": text, "count": count, "best_score": round(score, 2), "last_seen": round(ts, 3)}
+                for text, (count, score, ts) in ranked]
+
+
+class UnmatchedLog:
+    def __init__(self, directory: str = UNMATCHED_DIR):
+        self.directory = directory
+        self.summaries: dict = {}
+        self._buffer: list = []
+        self._ready = asyncio.Event()
+        self._task = None
+        self._closing = False
+        # Bir vaqtda faqat bitta partiya yoziladi (segmentga ikki thread qo'shmasin)
+        self._write_lock = asyncio.Lock()
+        self._segment = None
+        self.counters = {"recorded": 0, "written": 0, "dropped": 0, "batches": 0, "write_errors": 0}
+
+    # --- Hot path ---
+
+    def record(self, session_name: str, text: str, score: float):
+        """Xatoni qayd etadi: bloklamaydi, faylga yozish fon vazifasida."""
+        text = normalize(text)[:MAX_TEXT]
+        if not text:
+            return
+        ts = time.time()
+        self._summary(session_name).add(text, score, ts)
+        self.counters["recorded"] += 1
+        if len(self._buffer) >= UNMATCHED_BUFFER:
+            # Disk ulgurmayapti - xulosa yangilangan, faqat xom yozuv yo'qoladi
+            self.counters["dropped"] += 1
+            return
+        self._buffer.append({"s": session_name, "t": text, "c": round(score, 1), "ts": round(ts, 3)})
+        if len(self._buffer) >= UNMATCHED_BATCH:
+            self._ready.set()
+
+    def _summary(self, session_name: str) -> HeavyHitters:
+        summary = self.summaries.get(session_name)
+        if summary is None:
+            summary = self.summaries[session_name] = HeavyHitters()
+        return summary
+
+    # --- Segmentlar ---
+
+    def segments(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("unmatched-") and name.endswith(".jsonl"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _write(self, records: list):
+        data = b"".join(dumps(record) + b"\n" for record in records)
+        if self._segment is None or os.path.getsize(self._segment) >= UNMATCHED_SEGMENT_BYTES:
+            self._rotate()
+        with open(self._segment, "ab") as f:
+            f.write(data)
+
+    def _rotate(self):
+        os.makedirs(self.directory, exist_ok=True)
+        existing = self.segments()
+        if self._segment is None and existing and os.path.getsize(existing[-1]) < UNMATCHED_SEGMENT_BYTES:
+            # Oldingi jarayonning oxirgi segmentini davom ettiramiz
+            self._segment = existing[-1]
+            return
+        self._segment = os.path.join(self.directory, f"unmatched-{time.time_ns() // 1000}.jsonl")
+        for old in (existing + [self._segment])[:-UNMATCHED_SEGMENTS]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                logger.warning("Failed to remove old segment %s: %s", old, e)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        async with self._write_lock:
+            records, self._buffer = self._buffer, []
+            if not records:
+                return
+            try:
+                await asyncio.to_thread(self._write, records)
+                self.counters["written"] += len(records)
+                self.counters["batches"] += 1
+            except OSError as e:
+                self.counters["write_errors"] += 1
+                logger.error("Failed to write %d unmatched records: %s", len(records), e)
+
+    async def _flusher(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._ready.wait(), UNMATCHED_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            await self.flush()
+
+    # --- Ishga tushirish / to'xtatish ---
+
+    def _replay(self) -> int:
+        count = 0
+        for path in self.segments():
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        # Jarayon yozish paytida to'xtagan bo'lsa oxirgi qator chala qoladi
+                        continue
+                    if "forget" in record:
+                        # Sessiya o'chirilgan: undan oldingi yozuvlar hisobga olinmaydi
+                        self.summaries.pop(record["s"], None)
+                        continue
+                    self._summary(record["s"]).add(record["t"], record.get("c", 0.0), record.get("ts", 0.0))
+                    count += 1
+        return count
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._closing = False
+        count = await asyncio.to_thread(self._replay)
+        if count:
+            logger.info("Unmatched summary restored from %d records", count)
+        self._task = asyncio.create_task(self._flusher())
+
+    async def close(self):
+        # Bekor qilmaymiz: to'xtatilgan await ostida thread yozishda davom etib, yakuniy flush bilan
+        # bir segmentga parallel yozishi mumkin edi. Flusher joriy partiyani tugatib o'zi chiqadi.
+        if self._task is not None:
+            self._closing = True
+            self._ready.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    # --- O'qish ---
+
+    def top(self, session_name: str, limit: int = 20) -> dict:
+        summary = self.summaries.get(session_name)
+        if summary is None:
+            return {"session_name": session_name, "total": 0, "top": []}
+        return {"session_name": session_name, "total": summary.total, "top": summary.most_common(limit)}
+
+    def forget(self, session_name: str):
+        """Sessiya xulosasini o'chiradi; segmentlarga belgi yoziladi - qayta ishga tushganda
+        eski yozuvlar tiklanmaydi (shu nomli yangi sessiya ularni meros olmaydi)."""
+        self.summaries.pop(session_name, None)
+        self._buffer.append({"s": session_name, "forget": round(time.time(), 3)})
+        self._ready.set()
+
+    def metrics(self) -> dict:
+        return {**self.counters, "buffered": len(self._buffer), "segments": len(self.segments()),
+                "sessions": {name: summary.total for name, summary in self.summaries.items()}}
+
+
+unmatched_log = UnmatchedLog()
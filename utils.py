@@ -1,11 +1,17 @@
 # utils.py
 
-import json
 import os
+import stat
+import tempfile
+from collections import Counter
 from cachetools import LRUCache
-from config import DIRS, DEFAULT_DATA_PATH, MAX_CACHE_SIZE, logger
+from config import DIRS, DEFAULT_DATA_PATH, MAX_CACHE_SIZE, get_logger
+from logging_setup import payload
+from serialization import dumps, loads
 from fastapi import HTTPException
 
+logger = get_logger("storage")
+
 # Global o'zgaruvchilar
 session_data_cache = LRUCache(maxsize=MAX_CACHE_SIZE)  # Sessiya ma'lumotlari uchun kesh
 session_stats_cache = LRUCache(maxsize=MAX_CACHE_SIZE)  # Sessiya statistikasi uchun kesh
@@ -15,15 +21,75 @@ active_clients = {}  # Faol mijozlarni saqlash uchun lug'at (sessiya nomi -> mij
 def load_json(file_path: str, default={"data": {"pairs": []}}):
     """Berilgan fayl yo'lidan JSON ma'lumotlarini yuklaydi, agar fayl bo'lmasa default qiymatni qaytaradi."""
     if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(file_path, "rb") as f:
+            return loads(f.read())
     return default
 
+# mkstemp fayllari 0600 bilan yaratiladi; yangi fayllar uchun odatiy (umask) ruxsatlar
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Ilova o'zi yozgan fayllar versiyasi: fayl yo'li -> (mtime_ns, hajm)
+write_stamps: dict = {}
+
 # JSON faylni saqlash funksiyasi
 def save_json(file_path: str, data: dict):
-    """Berilgan ma'lumotlarni JSON faylga saqlaydi."""
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    """Berilgan ma'lumotlarni JSON faylga atomik tarzda saqlaydi."""
+    # Fayllar qo'lda tahrirlanadi (watcher), shuning uchun chiroyli formatda
+    write_atomic(file_path, dumps(data, pretty=True))
+
+# Faylni atomik almashtirish
+def write_atomic(file_path: str, content):
+    """Matn yoki baytlarni vaqtinchalik faylga yozib, fsync qilib, so'ng asl fayl o'rniga qo'yadi.
+
+    Yozish o'rtasida jarayon to'xtasa ham asl fayl buzilmaydi.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        # os.replace vaqtinchalik faylning ruxsatlarini saqlaydi - asl faylnikini ko'chiramiz
+        try:
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(content.encode("utf-8") if isinstance(content, str) else content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+    stamp_write(file_path)
+
+def _fsync_dir(directory: str):
+    # Nomi o'zgarganini diskka yozish (Windowsda katalogni ochib bo'lmaydi)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _file_stamp(file_path: str):
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def stamp_write(file_path: str):
+    """Faylni ilova tomonidan yozilgan deb belgilaydi (watcher uni qayta yuklamasligi uchun)."""
+    write_stamps[os.path.abspath(file_path)] = _file_stamp(file_path)
+
+def is_own_write(file_path: str) -> bool:
+    """Fayl hozirgi holati ilovaning oxirgi yozuviga mos keladimi."""
+    stamp = write_stamps.get(os.path.abspath(file_path))
+    return stamp is not None and stamp == _file_stamp(file_path)
 
 # Sessiya ma'lumotlari uchun fayl yo'lini olish
 def get_session_data_path(session_name: str) -> str:
@@ -38,6 +104,51 @@ def update_stats_cache(session_name: str, pairs: list):
         "total_responses": sum(len(pair["responses"]) for pair in pairs)
     }
 
+def duplicates_changed(old_pairs: list, new_pairs: list) -> bool:
+    """Bot indeksi kalitini (savol.lower()) boshqa savol bilan bo'lishadigan juftliklar o'zgarganmi.
+
+    Takrorlar o'zgarmagan bo'lsa (masalan data.json dagi ikki "shu"), ularga tegmagan tahrirlar
+    oddiy farq bilan qo'llanadi.
+    """
+    old_counts = Counter(pair["question"].lower() for pair in old_pairs)
+    new_counts = Counter(pair["question"].lower() for pair in new_pairs)
+    colliding = {key for counts in (old_counts, new_counts) for key, count in counts.items() if count > 1}
+    if not colliding:
+        return False
+    return ([pair for pair in old_pairs if pair["question"].lower() in colliding]
+            != [pair for pair in new_pairs if pair["question"].lower() in colliding])
+
+# Ikki juftliklar ro'yxati orasidagi farq
+def diff_pairs(old_pairs: list, new_pairs: list) -> dict:
+    """Savol bo'yicha farqni hisoblaydi: qo'shilgan, o'chirilgan va o'zgargan juftliklar.
+
+    O'zgarish takror savollarga tegsa farq ishonchsiz ("Salom"/"salom" bitta indeks kalitini
+    bo'lishadi, bir xil savollar birlashadi) - `rebuild` belgilanadi va indekslar to'liq qayta quriladi.
+    """
+    old_map = {pair["question"]: pair for pair in old_pairs}
+    new_map = {pair["question"]: pair for pair in new_pairs}
+    return {
+        "rebuild": duplicates_changed(old_pairs, new_pairs),
+        "added": [pair for question, pair in new_map.items() if question not in old_map],
+        "removed": [pair for question, pair in old_map.items() if question not in new_map],
+        "changed": [(old_map[question], pair) for question, pair in new_map.items()
+                    if question in old_map and old_map[question]["responses"] != pair["responses"]],
+    }
+
+def is_empty_diff(diff: dict) -> bool:
+    return not (diff["added"] or diff["removed"] or diff["changed"] or diff.get("rebuild"))
+
+def apply_stats_diff(session_name: str, pairs: list, diff: dict):
+    """Statistikani farq asosida yangilaydi; kesh bo'lmasa to'liq hisoblaydi."""
+    stats = session_stats_cache.get(session_name)
+    if stats is None or diff.get("rebuild"):
+        update_stats_cache(session_name, pairs)
+        return
+    stats["total_questions"] += len(diff["added"]) - len(diff["removed"])
+    stats["total_responses"] += (sum(len(p["responses"]) for p in diff["added"])
+                                 - sum(len(p["responses"]) for p in diff["removed"])
+                                 + sum(len(new["responses"]) - len(old["responses"]) for old, new in diff["changed"]))
+
 # Ma'lumotlarni o'zgartirish funksiyasi
 def modify_data(data: dict, operation: str, **kwargs):
     """Sessiya ma'lumotlarini turli operatsiyalar bilan o'zgartiradi (qo'shish, tahrirlash, o'chirish)."""
@@ -50,9 +161,9 @@ def modify_data(data: dict, operation: str, **kwargs):
         for pair in pairs:
             if pair["question"] == question:
                 pair["responses"].append(response)
-                logger.info(f"'{question}' savoliga javob qo'shildi: {pair}")
+                logger.debug("'%s' savoliga javob qo'shildi: %s", question, payload(pair))
                 return True
-        logger.warning(f"'{question}' savoli topilmadi: {pairs}")
+        logger.warning("'%s' savoli topilmadi (%d ta juftlik)", question, len(pairs))
         return False
 
     elif operation == "add_question":
@@ -61,7 +172,7 @@ def modify_data(data: dict, operation: str, **kwargs):
         responses = kwargs.get("responses", [])
         new_pair = {"question": question, "responses": responses}
         pairs.append(new_pair)
-        logger.info(f"Yangi savol qo'shildi: {new_pair}")
+        logger.debug("Yangi savol qo'shildi: %s", payload(new_pair))
         return new_pair
 
     elif operation == "edit_question":
@@ -74,9 +185,9 @@ def modify_data(data: dict, operation: str, **kwargs):
                 pair["question"] = new_question
                 if responses is not None:
                     pair["responses"] = responses
-                logger.info(f"'{old_question}' savoli '{new_question}' ga o'zgartirildi: {pair}")
+                logger.debug("'%s' savoli '%s' ga o'zgartirildi: %s", old_question, new_question, payload(pair))
                 return True
-        logger.warning(f"'{old_question}' savoli topilmadi")
+        logger.warning("'%s' savoli topilmadi", old_question)
         return False
 
     elif operation == "edit_response":
@@ -87,9 +198,9 @@ def modify_data(data: dict, operation: str, **kwargs):
         for pair in pairs:
             if pair["question"] == question and response_index < len(pair["responses"]):
                 pair["responses"][response_index] = response
-                logger.info(f"'{question}' savolidagi javob tahrirlandi: {pair}")
+                logger.debug("'%s' savolidagi javob tahrirlandi: %s", question, payload(pair))
                 return True
-        logger.warning(f"'{question}' savoli yoki javob indeksi topilmadi")
+        logger.warning("'%s' savoli yoki javob indeksi topilmadi", question)
         return False
 
     elif operation == "delete_question":
@@ -97,8 +208,8 @@ def modify_data(data: dict, operation: str, **kwargs):
         question = kwargs.get("question")
         initial_len = len(pairs)
         data["data"]["pairs"] = [p for p in pairs if p["question"] != question]
-        logger.info(f"'{question}' savoli o'chirildi, qoldiq juftliklar: {data['data']['pairs']}")
-        return len(pairs) != initial_len
+        logger.debug("'%s' savoli o'chirildi, qoldiq juftliklar: %d", question, len(data["data"]["pairs"]))
+        return len(data["data"]["pairs"]) != initial_len
 
     elif operation == "delete_response":
         # Javobni o'chirish
@@ -107,9 +218,9 @@ def modify_data(data: dict, operation: str, **kwargs):
         for pair in pairs:
             if pair["question"] == question and response_index < len(pair["responses"]):
                 pair["responses"].pop(response_index)
-                logger.info(f"'{question}' savolidan javob o'chirildi: {pair}")
+                logger.debug("'%s' savolidan javob o'chirildi: %s", question, payload(pair))
                 return True, len(pair["responses"]) > 0
-        logger.warning(f"'{question}' savoli yoki javob indeksi topilmadi")
+        logger.warning("'%s' savoli yoki javob indeksi topilmadi", question)
         return False, False
 
 